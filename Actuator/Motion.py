@@ -5,7 +5,7 @@ import cv2
 import serial
 import time
 import sys
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
 from Constant import const
 
 
@@ -23,6 +23,12 @@ class Motion:
         self.sleep_time = sleep_time
         self.lock = Lock()
         self.distance = 0
+        # 마지막으로 ACK(200) 를 받은 시각 (time.monotonic), 보낸 명령 수, 받은 ACK 수
+        # ACK 를 기다리는 쪽은 명령 lock 을 건드리지 않고 이 condition 으로 알림을 받는다
+        self.ack_condition = Condition()
+        self.ack_time = time.monotonic()
+        self.command_count = 0
+        self.ack_count = 0
         BPS = 4800  # 4800,9600,14400, 19200,28800, 57600, 115200
         # ---------local Serial Port : ttyS0 --------
         # ---------USB Serial Port : ttyAMA0 --------
@@ -43,9 +49,22 @@ class Motion:
 
     def TX_data_py2(self, one_byte):  # one_byte= 0~255
         self.lock.acquire()
+        with self.ack_condition:
+            self.command_count += 1
         self.serial_port.write(serial.to_bytes([one_byte]))  # python3
         time.sleep(0.02)
 
+    def wait_ack(self, timeout: float = None):
+        """마지막으로 보낸 명령의 ACK 를 기다린다. (TX_data_py2 는 다음 명령을 보낼 때에야 이전 ACK 를 기다리므로
+        명령 함수가 끝났어도 로봇은 아직 움직이는 중일 수 있다)
+        :param timeout: 없으면 ACK 가 올 때까지 기다린다
+        :return: ACK 를 받은 시각 (time.monotonic), timeout 초 안에 ACK 가 없으면 None
+        """
+        with self.ack_condition:
+            if not self.ack_condition.wait_for(lambda: self.ack_count >= self.command_count, timeout=timeout):
+                return None
+            return self.ack_time
+
     def RX_data(self):
         if self.serial_port.inWaiting() > 0:
             result = self.serial_port.read(1)
@@ -71,6 +90,12 @@ class Motion:
                     self.receiving_exit = 0
                     break
                 elif RX == 200:
+                    with self.ack_condition:
+                        self.ack_time = time.monotonic()
+                        # 명령은 lock 으로 하나씩 보내므로 ACK 는 지금까지 보낸 명령을 모두 끝냈다는 뜻이다.
+                        # 명령 없이 들어온 ACK 가 다음 명령의 ACK 로 미리 세어지지 않고, ACK 하나를 놓쳐도 계속 밀리지 않는다
+                        self.ack_count = self.command_count
+                        self.ack_condition.notify_all()
                     try:
                         self.lock.release()
                     except:
@@ -98,13 +123,14 @@ class Motion:
                 self.TX_data_py2(alpha_list[i])
                 time.sleep(2)
 
-    def set_head(self, dir, angle=0):
+    def set_head(self, dir, angle=0, sleep=0.3):
         """parameter 설명
         dir: {DOWN, LEFT, RIGHT, UPDOWN_CENTER, LEFTRIGHT_CENTER}
         angle: {DOWN:{10,20,30,35,45,50,55,60,70,75,80,85,90,100},
         LEFT:{30,45,60,90},
         RIGHT:{30,45,60,90}
         }
+        sleep: 명령을 보낸 뒤 기다리는 시간. 화면이 멈출 때까지 따로 기다린다면 0 (Robot.set_head)
         """
         if dir == 'DOWN':
             self.head_angle1 = angle
@@ -131,7 +157,7 @@ class Motion:
             self.TX_data_py2(center_list[dir])
         else:
             self.TX_data_py2(dir_list[dir][angle])
-        time.sleep(0.3)
+        time.sleep(sleep)
 
     def walk(self, dir, loop=1, sleep=0.1, wide=False, grab=False, open_door=False, IR=False, width=True):
         """
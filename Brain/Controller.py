@@ -3,7 +3,7 @@ from enum import Enum, auto
 from Brain.InDoorMission import InDoorMission
 from Brain.OutDoorMission import OutDoorMission
 from Brain.RoomMission import RoomMission, GreenRoomMission, BlackRoomMission
-from Constant import Direction, AreaColor, LineColor, WalkInfo, debug_mode, const
+from Constant import Direction, AreaColor, LineColor, WalkInfo, Vision, debug_mode, const
 
 import time
 
@@ -21,6 +21,14 @@ class Mode(Enum):
 class Controller:
     robot: Robot = Robot()
     mode: Mode = Mode.START
+    # 모드마다 쓰는 영상 처리 결과. IN, ROOM_MISSION, OUT 은 각 미션의 현재 모드를 따른다
+    VISION: dict = {
+        Mode.START: set(),
+        Mode.DETECT_DIRECTION: {Vision.ARROW},
+        Mode.CHECK_AREA_COLOR: {Vision.AREA},
+        Mode.GO_TO_NEXT_ROOM: {Vision.LINE},
+        Mode.END: set(),
+    }
     mission_done: int = 0
     fail_count: int = 0
     InDoorMission.set_robot(robot)
@@ -37,8 +45,7 @@ class Controller:
     def set_test_mode(cls, mode: Mode) -> None:
         cls.mode = mode
         if cls.mode == Mode.DETECT_DIRECTION:
-            cls.robot._motion.set_head(dir='DOWN', angle=70)
-            time.sleep(2)
+            cls.robot.set_head(dir='DOWN', angle=70)
             cls.ROI = False
             cls.robot.color=LineColor.YELLOW
         elif cls.mode == Mode.CHECK_AREA_COLOR:
@@ -68,7 +75,7 @@ class Controller:
     def go_to_next_room(cls) -> bool :
         #print(cls.robot.walk_info)
         if cls.robot.walk_info == WalkInfo.STRAIGHT:
-            if cls.robot.line_info["H"]:
+            if cls.robot.line_info.h:
                 cls.robot._motion.walk('FORWARD', 1, width = False)
             else:
                 cls.robot._motion.walk('FORWARD', 1)
@@ -131,10 +138,32 @@ class Controller:
         return Mission.run()
 
 
+    @classmethod
+    def get_vision_products(cls) -> set:
+        if cls.mode == Mode.IN:
+            return InDoorMission.get_vision_products()
+        elif cls.mode == Mode.ROOM_MISSION:
+            Mission = GreenRoomMission if RoomMission.area_color == AreaColor.GREEN else BlackRoomMission
+            return Mission.get_vision_products()
+        elif cls.mode == Mode.OUT:
+            return OutDoorMission.get_vision_products()
+        return cls.VISION.get(cls.mode, set())
+
     @classmethod
     def run(cls):
+        products = cls.get_vision_products()
+        # 한 틱 안의 판단이 모두 같은 프레임을 보도록 틱을 시작할 때 프레임 하나를 고정한다 (동작 명령을 보내면 새로 고정)
+        cls.robot.hold_frame(products)
+        try:
+            # 현재 모드가 쓰지 않는 선 검출은 건너뛴다
+            cls.robot.update_vision(products, ROI=cls.ROI)
+            return cls.run_mode()
+        finally:
+            cls.robot.release_frame()
+
+    @classmethod
+    def run_mode(cls):
         mode = cls.mode
-        cls.robot.set_line_and_edge_info(ROI=cls.ROI)
         print(mode.name)
         if mode == Mode.START:
             cls.mode = Mode.IN
@@ -190,8 +219,7 @@ class Controller:
                 print(Mode.ROOM_MISSION.name, cls.mission_done)
                 cls.ROI = True
                 cls.mode = Mode.GO_TO_NEXT_ROOM
-                cls.robot._motion.set_head("DOWN", angle=10)
-                time.sleep(0.5)
+                cls.robot.set_head("DOWN", angle=10)
 
         elif mode == Mode.OUT:
             cls.robot.color=LineColor.YELLOW
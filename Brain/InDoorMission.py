@@ -1,7 +1,7 @@
 from Brain.Robot import Robot
 from enum import Enum, auto
 import time
-from Constant import Direction, WalkInfo, debug_mode, const
+from Constant import Direction, WalkInfo, Vision, debug_mode, const
 
 class Mode(Enum):
     START = auto()
@@ -14,6 +14,16 @@ class InDoorMission:
     mode: Mode = Mode.START
     robot: Robot = Robot
     detect_miss: int = 0
+    VISION: dict = {
+        Mode.START: set(),
+        Mode.DETECT_ALPHABET: {Vision.ALPHABET},
+        Mode.IN_DOOR: {Vision.LINE},
+        Mode.END: set(),
+    }
+
+    @classmethod
+    def get_vision_products(cls) -> set:
+        return cls.VISION.get(cls.mode, set())
 
     @classmethod
     def set_robot(cls, robot: Robot):
@@ -21,8 +31,7 @@ class InDoorMission:
 
     @classmethod
     def detect_alphabet(cls) -> bool:
-        cls.robot._motion.set_head(dir="DOWN", angle=cls.robot.curr_head4door_alphabet[0])
-        time.sleep(1.5)
+        cls.robot.set_head(dir="DOWN", angle=cls.robot.curr_head4door_alphabet[0])
         if not debug_mode.IS_ON:
             alphabet = debug_mode.DOOR_ALPHABET
         else:
@@ -47,12 +56,12 @@ class InDoorMission:
             if cls.robot.walk_info == WalkInfo.STRAIGHT:
                 cls.robot._motion.walk('FORWARD', loop=2, open_door=True, width=False)
             elif cls.robot.walk_info == WalkInfo.V_LEFT:
-                if cls.robot.line_info['H_Y'][1] <= 100:
+                if cls.robot.line_info.h_y1 <= 100 * cls.robot.scale:
                     cls.robot._motion.walk('LEFT', loop=1, open_door=True)
                 else:
                     cls.robot._motion.walk('FORWARD', loop=2, open_door=True, width=False)
             elif cls.robot.walk_info == WalkInfo.V_RIGHT:
-                if cls.robot.line_info['H_Y'][1] <= 100:
+                if cls.robot.line_info.h_y1 <= 100 * cls.robot.scale:
                     cls.robot._motion.walk('RIGHT', loop=1, open_door=True)
                 else:
                     cls.robot._motion.walk('FORWARD', loop=2, open_door=True, width=False)
@@ -63,8 +72,7 @@ class InDoorMission:
 
             elif cls.robot.walk_info in [ WalkInfo.DIRECTION_LINE, WalkInfo.CORNER_RIGHT, WalkInfo.CORNER_LEFT] :
                 cls.robot._motion.basic_form()
-                cls.robot._motion.set_head(dir='DOWN', angle=60)
-                time.sleep(2)
+                cls.robot.set_head(dir='DOWN', angle=60)
                 return True
 
             else: # WalkInfo.BACKWARD
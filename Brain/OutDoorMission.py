@@ -1,7 +1,7 @@
 from Brain.Robot import Robot
 from enum import Enum, auto
 import time
-from Constant import Direction, const
+from Constant import Direction, Vision, const
 import numpy as np
 
 class Mode(Enum):
@@ -14,6 +14,16 @@ class OutDoorMission:
 
     mode: Mode = Mode.START
     robot: Robot = Robot
+    VISION: dict = {
+        Mode.START: set(),
+        Mode.OUT_LINE: {Vision.LINE},
+        Mode.OUT_DOOR: set(),
+        Mode.END: set(),
+    }
+
+    @classmethod
+    def get_vision_products(cls) -> set:
+        return cls.VISION.get(cls.mode, set())
 
     @classmethod
     def set_robot(cls, robot: Robot):
@@ -22,7 +32,7 @@ class OutDoorMission:
     @classmethod
     def out_line(cls) -> bool:
         #print(np.mean(cls.robot.line_info['H_Y']))
-        if not cls.robot.line_info['H'] or np.mean(cls.robot.line_info['H_Y']) > 155:
+        if not cls.robot.line_info.h or cls.robot.line_info.h_y > 155 * cls.robot.scale:
             return True
         else:
             cls.robot._motion.walk('FORWARD', 1, width = False)
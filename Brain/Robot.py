@@ -1,20 +1,23 @@
 from Sensor.ImageProcessor import ImageProcessor
+from Sensor.LineInfo import LineInfo, EdgeInfo
 from Actuator.Motion import Motion
-from Constant import LineColor, Direction, WalkInfo
+from Constant import LineColor, Direction, WalkInfo, Vision, const
 from collections import deque
 
 class Robot:
     def __init__(self, video_path =""):
         self._motion = Motion()
         self._image_processor = ImageProcessor(video_path=video_path)
+        # 동작 직후 움직이는 중에 찍힌 프레임을 쓰지 않도록 ACK 시각을 공유한다
+        self._image_processor.bind_motion(self._motion)
         self.curr_head4door_alphabet = deque([80, 75])
         self.curr_head4room_alphabet: deque
         self.curr_head4box: deque
         self.curr_head4find_corner: deque
         self.color: LineColor = LineColor.YELLOW
         self.black_room: list = list()
-        self.line_info: dict
-        self.edge_info: dict
+        self.line_info: LineInfo
+        self.edge_info: EdgeInfo
         self.walk_info: WalkInfo
         self.direction: Direction
 
@@ -25,7 +28,38 @@ class Robot:
         self.cube_grabbed = False
 
 
-    def set_line_and_edge_info(self, line_visualization=False, edge_visualization=False, ROI= False):
-        self.line_info, self.edge_info, _ = self._image_processor.line_tracing(color=self.color.name, line_visualization = line_visualization, edge_visualization=edge_visualization, ROI=ROI)
+    @property
+    def scale(self) -> float:
+        """기준 해상도(640x480) 대비 영상 처리 해상도 배율. 미션의 픽셀 단위 기준값에 곱해서 쓴다"""
+        return self._image_processor.scale
+
+    def set_head(self, dir, angle=0):
+        """Motion.set_head 후 고정 시간 대신 카메라 화면이 멈출 때까지만 기다린다."""
+        self._motion.set_head(dir=dir, angle=angle, sleep=0)
+        self.wait_until_settled()
+
+    def wait_until_settled(self):
+        """고정 시간 sleep 대신, 마지막 동작의 ACK 뒤 카메라 화면이 멈출 때까지만 기다린다."""
+        self._image_processor.wait_until_settled()
+
+    def update_vision(self, products: set, ROI=False):
+        """틱마다 미리 계산해두는 결과(line_info, edge_info, walk_info)는 products 에 있을 때만 계산한다.
+        나머지 결과는 각 미션이 필요할 때 ImageProcessor 에서 바로 가져간다.
+        """
+        if Vision.LINE in products or Vision.EDGE in products:
+            # edge_info 를 안 쓰는 틱이면 곧은 선은 빠른 검출로 충분하다
+            self.set_line_and_edge_info(ROI=ROI, fast=const.LINE_SCANLINE and Vision.EDGE not in products)
+
+    def hold_frame(self, products: set):
+        """쓰는 결과가 하나라도 있으면 틱 동안 쓸 프레임을 고정한다. 선을 검출하는 틱이면 선명한 프레임을 고른다."""
+        if products:
+            min_quality = const.LINE_MIN_QUALITY if Vision.LINE in products or Vision.EDGE in products else None
+            self._image_processor.hold_frame(min_quality=min_quality)
+
+    def release_frame(self):
+        self._image_processor.release_frame()
+
+    def set_line_and_edge_info(self, line_visualization=False, edge_visualization=False, ROI= False, fast=False):
+        self.line_info, self.edge_info, _ = self._image_processor.line_tracing(color=self.color.name, line_visualization = line_visualization, edge_visualization=edge_visualization, ROI=ROI, fast=fast)
         if self.color == LineColor.YELLOW:
             self.walk_info = self._image_processor.line_checker(self.line_info)
\ No newline at end of file
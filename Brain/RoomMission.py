@@ -1,5 +1,6 @@
 from Brain.Robot import Robot
-from Constant import Direction, AreaColor, LineColor, WalkInfo, const, debug_mode
+from Sensor.LineInfo import LineInfo
+from Constant import Direction, AreaColor, LineColor, WalkInfo, Vision, const, debug_mode
 from enum import Enum, auto
 from collections import deque
 import time
@@ -26,23 +27,26 @@ class BoxPos(Enum):
     MIDDLE = auto()
     LEFT = auto()
 
-def get_distance_from_baseline(pos: tuple, baseline: tuple = (320, 370)):
+def get_distance_from_baseline(pos: tuple, size: tuple, baseline: tuple = const.BOX_BASELINE):
     """
-    :param box_info: 우유팩 위치 정보를 tuple 형태로 받아온다. 우유팩 영역 중심 x좌표와 y좌표 순서
-    :param baseline: 우유팩 위치 정보와 비교할 기준점이다.
+    :param box_info: 우유팩 위치 정보를 tuple 형태로 받아온다. 우유팩 영역 중심 x좌표와 y좌표 순서 (처리 해상도 픽셀)
+    :param size: 영상 처리 해상도 (w, h)
+    :param baseline: 우유팩 위치 정보와 비교할 기준점이다. 화면 크기 대비 비율
     :return: 우유팩이 지정한 기준점으로부터 떨어진 상대적 거리를 tuple로 반환한다.
+        처리 해상도와 상관없이 같은 기준으로 판단하도록 기준 해상도(640x480)의 픽셀 단위로 돌려준다.
     """
-    bx, by = baseline
-    cx, cy = pos
+    (w, h), (rw, rh) = size, const.REFERENCE_SIZE
+    bx, by = round(baseline[0] * rw), round(baseline[1] * rh)
+    cx, cy = pos[0] * rw / w, pos[1] * rh / h
     return bx - cx, by - cy
 
-def corner_filtering(corner:tuple, line_info:dict):
+def corner_filtering(corner:tuple, line_info: LineInfo, scale: float = 1.0):
     if corner is None:
         return False
     cx, cy = corner[0], corner[1]
-    max_y = line_info["ALL_Y"][1]
+    max_y = line_info.all_y1
     dy = abs(max_y-cy)
-    return dy <= const.CORNER_FILTER_DISTANCE
+    return dy <= const.CORNER_FILTER_DISTANCE * scale
 
 def get_slope_from_baseline(pos: tuple, base: tuple=(320,480)) -> float :
     cx, cy = pos
@@ -60,6 +64,12 @@ class RoomMission:
     alphabet: str
     area_color: AreaColor
     detect_miss: int = 0
+    # 모드마다 쓰는 영상 처리 결과 (Controller 가 이 중 line_info 만 미리 계산한다)
+    VISION: dict = {}
+
+    @classmethod
+    def get_vision_products(cls) -> set:
+        return cls.VISION.get(cls.mode, set())
 
     @classmethod
     def reset(cls):
@@ -82,16 +92,16 @@ class RoomMission:
         cls.area_color = area_color
 
 
+    @classmethod
+    def get_distance(cls, pos: tuple) -> tuple:
+        image_processor = cls.robot._image_processor
+        return get_distance_from_baseline(pos=pos, size=(image_processor.width, image_processor.height))
+
     @classmethod
     def check_area_color(cls):
-        cls.robot._motion.set_head(dir=cls.robot.direction.name, angle=45)
-        cls.robot._motion.set_head(dir="DOWN", angle=45)
-        time.sleep(1)
+        cls.robot._motion.set_head(dir=cls.robot.direction.name, angle=45, sleep=0)
+        cls.robot.set_head(dir="DOWN", angle=45)
         cls.robot.color = LineColor.GREEN
-        cls.robot.set_line_and_edge_info()
-
-        #print(cls.robot.edge_info)
-        #print(cls.robot.line_info)
 
         cls.area_color = AreaColor.GREEN if cls.robot._image_processor.check_area_color() else AreaColor.BLACK
         cls.robot._motion.notice_area(area=cls.area_color.name)
@@ -133,7 +143,7 @@ class RoomMission:
 
         width = False if head_angle in [35,45] else True
         if box_info:
-            (dx, dy) = get_distance_from_baseline(pos=box_info)
+            (dx, dy) = cls.get_distance(pos=box_info)
 
             Y_LIMIT = 10 if head_angle is not 35 else 10
 
@@ -204,11 +214,11 @@ class RoomMission:
 
     @classmethod
     def out_room(cls) -> bool:
-        if cls.robot.line_info["V"]:
-            if 300 < cls.robot.line_info["V_X"][0] < 340:
+        if cls.robot.line_info.v:
+            if 300 * cls.robot.scale < cls.robot.line_info.v_x0 < 340 * cls.robot.scale:
                 cls.robot._motion.walk(dir='FORWARD', loop=2)
                 return True
-            elif cls.robot.line_info["V_X"][0] <= 300:
+            elif cls.robot.line_info.v_x0 <= 300 * cls.robot.scale:
                 cls.robot._motion.walk(dir='LEFT', loop=1)
             else:
                 cls.robot._motion.walk(dir='RIGHT', loop=1)
@@ -224,6 +234,19 @@ class GreenRoomMission(RoomMission):
 
     box_pos: BoxPos
     fast_turn : Direction
+    VISION: dict = {
+        Mode.START: set(),
+        Mode.DETECT_ALPHABET: set(), # 초록 방은 알파벳을 읽지 않는다
+        Mode.FIND_BOX: {Vision.BOX},
+        Mode.TRACK_BOX: {Vision.BOX},
+        Mode.TURN_TO_AREA: {Vision.LINE},
+        Mode.GO_TO_AREA: {Vision.LINE},
+        Mode.DROP_BOX: set(),
+        Mode.FIND_CONRER: {Vision.CORNER, Vision.LINE},
+        Mode.GO_TO_CORNER: {Vision.CORNER, Vision.LINE},
+        Mode.OUT_ROOM: {Vision.LINE},
+        Mode.END: set(),
+    }
 
     @classmethod
     def find_box(cls) -> bool:
@@ -253,7 +276,7 @@ class GreenRoomMission(RoomMission):
     @classmethod
     def turn_to_area(cls) -> bool:
 
-        found_area: bool = cls.robot.line_info["H"] and cls.robot.line_info["len(H)"] >= 300
+        found_area: bool = cls.robot.line_info.h and cls.robot.line_info.len_h >= 300 * cls.robot.scale
 
         if found_area:
             cls.robot._motion.move_arm(dir='HIGH')
@@ -264,7 +287,7 @@ class GreenRoomMission(RoomMission):
 
     @classmethod
     def go_to_area(cls) -> bool:
-        in_area: bool = cls.robot.line_info['ALL_Y'][1] > const.GREEN_ROOM_AREA_IN_LIMIT
+        in_area: bool = cls.robot.line_info.all_y1 > const.GREEN_ROOM_AREA_IN_LIMIT * cls.robot.scale
         if in_area:
             return True
         cls.robot._motion.walk(dir="FORWARD", loop=1, grab=True)
@@ -275,7 +298,7 @@ class GreenRoomMission(RoomMission):
     def find_corner(cls) -> bool:
         head_angle = cls.robot.curr_head4find_corner[0]
         corner = cls.robot._image_processor.get_yellow_line_corner()
-        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info) else None
+        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info, scale=cls.robot.scale) else None
 
         if corner :
             return True
@@ -295,9 +318,9 @@ class GreenRoomMission(RoomMission):
         head_angle = cls.robot.curr_head4find_corner[0]
         width = False if head_angle in [35,45] else True
         corner = cls.robot._image_processor.get_yellow_line_corner()
-        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info) else None
+        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info, scale=cls.robot.scale) else None
         if corner :
-            (dx, dy) = get_distance_from_baseline(pos=corner)
+            (dx, dy) = cls.get_distance(pos=corner)
             if dy > 10:  # 기준선 보다 위에 있다면
                 if -50 <= dx <= 50:
                     cls.robot._motion.walk(dir='FORWARD', loop=1, width=width)
@@ -349,7 +372,7 @@ class GreenRoomMission(RoomMission):
             if cls.track_box():
                 cls.mode = Mode.TURN_TO_AREA
                 cls.robot._motion.turn(dir=cls.fast_turn.name, grab=True, wide=True, sliding=True, loop=const.GREEN_ROOM_DEFAULT_TURN_FIND_AREA)
-                time.sleep(0.5)
+                cls.robot.wait_until_settled()
 
         elif mode == Mode.TURN_TO_AREA:
             if cls.turn_to_area():
@@ -365,18 +388,19 @@ class GreenRoomMission(RoomMission):
                 cls.robot._motion.set_head("DOWN", angle=cls.robot.curr_head4find_corner[0])
                 cls.robot.color = LineColor.YELLOW
                 cls.robot._motion.turn(dir=cls.fast_turn.name, loop=const.GREEN_ROOM_DEFAULT_TURN_FIND_CORNER, wide=True, sliding=True)
-                time.sleep(0.5)
+                cls.robot.wait_until_settled()
 
         elif mode == Mode.FIND_CONRER:
             if cls.find_corner():
                 cls.mode = Mode.GO_TO_CORNER
-            time.sleep(0.2)
+            # 머리 각도를 바꾸거나 걸었으면 다음 틱 프레임은 멈춘 화면이어야 한다
+            cls.robot.wait_until_settled()
         elif mode == Mode.GO_TO_CORNER:
             if cls.go_to_corner():
                 cls.mode = cls.mode = Mode.OUT_ROOM
                 loop: int = 4 if cls.fast_turn == Direction.RIGHT else 2
                 cls.robot._motion.turn(dir=cls.robot.direction.name, loop=loop)
-            time.sleep(0.2)
+            cls.robot.wait_until_settled()
 
         elif mode == Mode.OUT_ROOM:
             if cls.out_room():
@@ -389,12 +413,24 @@ class GreenRoomMission(RoomMission):
 
 class BlackRoomMission(RoomMission):
 
+    VISION: dict = {
+        Mode.START: set(),
+        Mode.DETECT_ALPHABET: {Vision.ALPHABET},
+        Mode.FIND_BOX: {Vision.BOX},
+        Mode.TRACK_BOX: {Vision.BOX},
+        Mode.FIND_YELLOW_LINE: {Vision.LINE},
+        Mode.GO_OUT_AREA: {Vision.BLACK_AREA},
+        Mode.DROP_BOX: set(),
+        Mode.FIND_CONRER: {Vision.CORNER, Vision.LINE},
+        Mode.GO_TO_CORNER: {Vision.CORNER},
+        Mode.OUT_ROOM: {Vision.LINE},
+        Mode.END: set(),
+    }
+
     @classmethod
     def find_box(cls) -> bool:
 
         head_angle = cls.robot.curr_head4box[0]
-        time.sleep(0.2)
-        cls.robot.set_line_and_edge_info()
         box_info = cls.robot._image_processor.get_milk_info(color=cls.alphabet_color)
 
         if box_info:
@@ -405,16 +441,16 @@ class BlackRoomMission(RoomMission):
                 
             cls.robot.curr_head4box.rotate(-1)
             head_angle = cls.robot.curr_head4box[0]
-            cls.robot._motion.set_head("DOWN", angle=head_angle)
+            cls.robot.set_head("DOWN", angle=head_angle)
             return False
 
 
     @classmethod
     def find_yellow_line(cls) -> bool:
-        if cls.robot.line_info["ALL_Y"][1] + cls.robot.line_info["ALL_Y"][0] :
+        if cls.robot.line_info.all_y1 + cls.robot.line_info.all_y0 :
             return True
         cls.robot._motion.turn(dir=cls.robot.direction.name, grab=True, sliding=True, loop=2)
-        time.sleep(0.5)
+        cls.robot.wait_until_settled()
         return False
 
 
@@ -423,7 +459,7 @@ class BlackRoomMission(RoomMission):
     def find_corner(cls) -> bool:
 
         corner = cls.robot._image_processor.get_yellow_line_corner()
-        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info) else None
+        corner = corner if corner_filtering(corner=corner, line_info=cls.robot.line_info, scale=cls.robot.scale) else None
         if corner:
             return True
         else:
@@ -440,7 +476,7 @@ class BlackRoomMission(RoomMission):
         width = False if head_angle in [35,45] else True
         corner = cls.robot._image_processor.get_yellow_line_corner()
         if corner:
-            (dx, dy) = get_distance_from_baseline(pos=corner)
+            (dx, dy) = cls.get_distance(pos=corner)
             if dy > 20:  # 기준선 보다 위에 있다면
                 if -50 <= dx <= 50:
                     cls.robot._motion.walk(dir='FORWARD', loop=1, width=width)
@@ -497,7 +533,7 @@ class BlackRoomMission(RoomMission):
                 cls.mode = Mode.FIND_BOX
                 cls.robot._motion.set_head("DOWN", angle=cls.robot.curr_head4box[0])
                 cls.robot._motion.turn(dir=cls.robot.direction.name, loop=const.BLACK_ROOM_DEFAULT_TURN_FIND_BOX)
-                time.sleep(1)
+                cls.robot.wait_until_settled()
 
         elif mode == Mode.FIND_BOX:
             if cls.find_box():
@@ -509,7 +545,7 @@ class BlackRoomMission(RoomMission):
                 cls.robot.color = LineColor.YELLOW
                 cls.robot._motion.set_head("DOWN", angle=60)
                 cls.robot._motion.turn(dir=cls.robot.direction.name, grab=True, wide=True, sliding=True, loop=const.BLACK_ROOM_DEFAULT_TURN_FIND_CORNER)
-                time.sleep(0.5)
+                cls.robot.wait_until_settled()
 
         elif mode == Mode.FIND_YELLOW_LINE:
             if cls.find_yellow_line():
@@ -27,6 +27,17 @@ class WalkInfo(Enum):
     MODIFY_RIGHT = auto()
     BACKWARD = auto()
 
+class Vision(Enum):
+    """모드마다 쓰는 영상 처리 결과. Controller 는 현재 모드가 쓰는 것만 계산한다."""
+    LINE = auto() # line_info, walk_info (line_tracing)
+    EDGE = auto() # edge_info (line_tracing)
+    CORNER = auto() # get_yellow_line_corner
+    BOX = auto() # get_milk_info
+    AREA = auto() # check_area_color
+    ALPHABET = auto() # get_door_alphabet_using_iou, get_alphabet_info4room
+    ARROW = auto() # get_arrow_direction
+    BLACK_AREA = auto() # is_out_of_black
+
 class Constant:
     def __setattr__(self, name, value):
         if name in self.__dict__:
@@ -67,6 +78,72 @@ const.DOOR_THRESH_VALUE = 66
 
 ## DIRECTION ##
 const.DIRECTION_THRESH_VALUE = 30
+const.ARROW_END_RATIO = 0.15 # 화살표 양 끝에서 두께를 비교할 구간 (폭 대비 비율)
+const.ARROW_CONFIDENCE_THRESH = 0.1 # 이보다 낮으면 해시 검출기로 다시 확인
+
+### CAPTURE ###
+const.CAPTURE_BUFFER_SIZE = 8 # 캡처 링 버퍼 슬롯 수. 받은 프레임은 이 수만큼 새 프레임이 들어오기 전까지 유효
+const.MOTION_SETTLE_TIME = 0.15 # 동작 ACK 후 흔들림이 멎을 때까지의 여유 (초). 이보다 먼저 찍힌 프레임은 쓰지 않는다
+const.MOTION_ACK_TIMEOUT = 5 # ACK 를 기다리는 최대 시간 (초). 넘으면 그냥 최근 프레임을 쓴다
+const.SETTLE_SIZE = (80, 60) # 화면 흔들림을 비교할 축소 해상도 (w, h)
+const.SETTLE_DIFF_THRESH = 1.0 # 연속 프레임 gray 평균 절대 차이가 이보다 작으면 멈춘 것으로 본다 (정지 영상 약 0.1~0.3)
+const.SETTLE_FRAMES = 2 # 연속으로 이만큼 멈춰 있어야 안정된 것으로 본다
+const.SETTLE_TIMEOUT = 1.5 # 최대로 기다리는 시간 (초)
+const.QUALITY_SIZE = (160, 120) # 선명도를 계산할 축소 해상도 (w, h)
+const.QUALITY_WINDOW = 6 # 선명도를 비교할 최근 프레임 수 (CAPTURE_BUFFER_SIZE 보다 작아야 함)
+const.QUALITY_WAIT_FRAMES = 5 # 선명한 프레임을 기다리는 최대 프레임 수. 넘으면 그중 가장 선명한 프레임을 쓴다
+const.QUALITY_WAIT_TIMEOUT = 0.3 # 선명한 프레임을 기다리는 전체 최대 시간 (초). 30fps 에서 QUALITY_WAIT_FRAMES 장보다 조금 길다
+const.LINE_MIN_QUALITY = 0.5 # 선 / 코너 검출에 쓸 프레임의 최소 선명도 (최근 프레임 중 가장 선명한 것 대비 비율)
+const.DEDUPE_SIZE = (32, 24) # 같은 장면인지 비교할 프레임 서명 해상도 (w, h)
+const.DEDUPE_DIFF_THRESH = 1.0 # 서명의 평균 절대 차이가 이보다 작으면 같은 장면으로 보고 검출 결과를 재사용
+const.DEDUPE_TTL = 1.0 # 검출 결과를 재사용하는 최대 시간 (초)
+
+### GEOMETRY ###
+# 화면 위치에 관한 상수는 화면 크기 대비 비율로 둔다. (기준 해상도 640x480 에서 쓰던 픽셀 값 / 640, / 480)
+# 그 밖의 픽셀 단위 값(선 길이, 넓이 등)은 기준 해상도에서 정한 값에 처리 해상도 배율(처리 폭 / 기준 폭)을 곱해서 쓴다
+const.REFERENCE_SIZE = (640, 480) # 픽셀 단위 값들을 정한 기준 해상도 (w, h)
+const.PROCESSING_SIZE = (640, 480) # 영상 처리 해상도 (w, h). 카메라 해상도와 다르면 프레임을 줄여서 처리한다
+const.DIRECTION_LINE_X = (300 / 640, 340 / 640) # 가로선 중심이 이 사이면 방향 표시선, 오른쪽이면 오른쪽 코너
+const.STRAIGHT_LINE_X = (290 / 640, 350 / 640) # 세로선 중심이 이 사이면 직진, 바깥이면 옆으로 이동
+const.CORNER_LINE_MAX_Y = 240 / 480 # 가로선이 이보다 위에 있으면 방향 표시선 / 코너로 본다
+const.LINE_ROI_HEIGHT = 200 / 480 # line_tracing(ROI=True) 에서 보는 위쪽 영역 높이
+const.LINE_ROI_EDGE_X = (200 / 640, 440 / 640) # line_tracing(ROI_edge=True) 에서 보는 가운데 영역
+const.BLACK_AREA_ROI = (160 / 640, 200 / 480, 480 / 640, 420 / 480) # is_out_of_black 에서 검은색 비율을 보는 영역 (x0, y0, x1, y1)
+const.BOX_BASELINE = (320 / 640, 370 / 480) # 우유팩 / 코너 위치를 비교하는 기준점 (x, y)
+const.LINE_PYRAMID_LEVEL = 0 # 0: 원래 해상도에서 선분 검출, n: 1/2^n 해상도에서 찾고 원래 해상도에서 다듬는다
+const.LINE_REFINE_SAMPLES = 16 # 선분을 다듬을 때 선분 위에서 edge 를 찾는 점 개수
+const.LINE_TRACKING = False # 노란 선을 LineTracker 로 추적해서 예측한 위치 근처에서만 선분을 찾는다
+const.TRACK_PROCESS_NOISE = 8 # 틱(동작 명령) 하나 사이에 선이 움직일 수 있는 정도 (기준 해상도 픽셀, DEGREE 는 도)
+const.TRACK_MEASUREMENT_NOISE = 5 # 선 검출 결과의 오차 (기준 해상도 픽셀, DEGREE 는 도)
+const.TRACK_MARGIN = 10 # 예측한 선 주변으로 더 보는 폭 (기준 해상도 픽셀)
+const.TRACK_SIGMA = 2 # 예측 표준편차의 몇 배까지 볼지
+const.TRACK_ENTRY_HEIGHT = 60 / 480 # 가로선을 추적하지 않을 때 새 가로선이 들어오는지 보는 위쪽 띠 높이
+const.TRACK_REFRESH = 5 # 이 틱마다 한 번은 화면 전체에서 선분을 찾는다
+const.TRACK_MAX_MISSES = 3 # 화면 전체에서도 이만큼 연속으로 선을 못 찾으면 추적을 버린다
+const.LINE_SCANLINE = True # 곧은 노란 선 하나만 보이는 틱은 Hough 대신 행 무게중심으로 선을 맞춘다 (get_scanline_lines)
+const.SCANLINE_ROWS = 24 # mask 에서 보는 행 개수
+const.SCANLINE_MIN_WIDTH = 4 # 이보다 좁게 덮인 행은 잡음으로 보고 버린다 (기준 해상도 픽셀)
+const.SCANLINE_H_WIDTH = 100 # 이보다 넓게 덮인 행은 가로선이 지나는 행으로 본다 (기준 해상도 픽셀)
+const.SCANLINE_MAX_GAP = 10 # 한 행 안의 빈 칸이 이보다 많으면 선이 하나가 아니다 (기준 해상도 픽셀)
+const.SCANLINE_MIN_ROWS = 4 # 세로선으로 맞추는 데 필요한 최소 행 개수
+const.SCANLINE_MAX_RESIDUAL = 6 # 무게중심이 맞춘 직선에서 벗어난 정도(RMS)가 이보다 크면 직선이 아니다 (기준 해상도 픽셀)
+const.HOUGH_ADAPTIVE = True # 선분이 너무 많은 장면에서는 HoughLinesP 투표 수 / 최소 길이를 올려서 선분 수를 줄인다 (HoughController)
+const.HOUGH_SEGMENT_BAND = (20, 60) # 선 검출(노란 선, 초록 선) 한 프레임의 목표 선분 수 (최소, 최대)
+const.CORNER_SEGMENT_BAND = (50, 150) # 코너 검출 한 프레임의 목표 선분 수 (최소, 최대)
+const.HOUGH_GAIN_STEP = 1.25 # 선분 수가 범위를 벗어날 때 한 프레임에 투표 수 / 최소 길이를 올리거나 내리는 배율
+const.HOUGH_MAX_GAIN = 4.0 # 투표 수 / 최소 길이를 원래 값의 몇 배까지 올릴지
+
+### HASH ###
+const.HASH_DIM = (64, 64) # 평균 해시 해상도 (w, h), w*h 는 8의 배수
+
+### ALPHABET ENGINE ###
+# 알파벳 인식 방법. "HASH": 평균 해시(HashDetector), "SHAPE": 모양 특징(ShapeDetector)
+const.DOOR_ALPHABET_ENGINE = "HASH"
+const.ROOM_ALPHABET_ENGINE = "HASH"
+const.SHAPE_ZONES = (4, 4) # 구역 나누는 수 (w, h)
+const.SHAPE_HU_WEIGHT = 0.1 # log 스케일 Hu moment 에 곱하는 가중치
+const.SHAPE_THRESH4DOOR = 0.2
+const.SHAPE_THRESH4ROOM = 0.2
 
 ### CORNER FILTERING ###
 const.CORNER_FILTER_DISTANCE = 40
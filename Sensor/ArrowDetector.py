@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+from Constant import const
+
+
+class ArrowDetector:
+    """템플릿 없이 화살표 모양만 보고 방향을 추정한다.
+    화살표를 세로로 훑은 열(column) 별 두께를 보면, 꼬리 쪽 끝은 몸통 두께만큼 두껍고 머리 쪽 끝은 뾰족해서 0 에 가깝다.
+    양 끝의 평균 두께 차이를 가장 두꺼운 열(머리 밑변)로 나눈 값을 confidence 로 쓴다. (정면 템플릿 기준 약 0.3)
+    """
+
+    end_ratio = const.ARROW_END_RATIO
+
+    @classmethod
+    def estimate(cls, img: np.ndarray) -> tuple:
+        """
+        :param img: 화살표 영역의 gray 이미지 (흰 바탕에 검은 화살표)
+        :return: ("LEFT" 또는 "RIGHT", confidence), 화살표가 없으면 (None, 0.0)
+        """
+        if len(img.shape) == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) == 0:
+            return None, 0.0
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        if w < 10 or h < 10:
+            return None, 0.0
+
+        # 열 별 화살표 두께 (픽셀 수)
+        profile = cv2.reduce(binary[y:y + h, x:x + w], 0, cv2.REDUCE_SUM, dtype=cv2.CV_32F).reshape(-1) / 255
+        k = max(int(w * cls.end_ratio), 1)
+        left, right = profile[:k].mean(), profile[-k:].mean()
+        score = (right - left) / max(profile.max(), 1)
+        # 오른쪽 끝이 더 두꺼우면 꼬리가 오른쪽, 즉 머리가 왼쪽
+        return ("LEFT" if score > 0 else "RIGHT"), float(abs(score))
+
+
+if __name__ == "__main__":
+    from Sensor.ImageProcessor import ImageProcessor
+    imageProcessor = ImageProcessor(video_path='Sensor/src/arrow_test/arrow_left.h264')
+    while True:
+        roi = imageProcessor.get_arrow_roi(visualization=True)
+        if roi is not None:
+            print(ArrowDetector.estimate(roi))
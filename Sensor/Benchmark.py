@@ -0,0 +1,448 @@
+"""녹화해둔 영상(Sensor/src)으로 검출기의 정확도와 속도를 측정하는 개발용 스크립트. 실전에서는 필요없음
+
+    python -m Sensor.Benchmark hash
+    python -m Sensor.Benchmark shape
+    python -m Sensor.Benchmark arrow
+    python -m Sensor.Benchmark nodes
+    python -m Sensor.Benchmark resolution
+    python -m Sensor.Benchmark pyramid
+    python -m Sensor.Benchmark tracking
+    python -m Sensor.Benchmark scanline
+    python -m Sensor.Benchmark hough
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from Sensor.ImageProcessor import ImageProcessor
+from Sensor.FrameBuffer import CapturedFrame, get_quality
+from Sensor.HashDetector import HashDetector
+from Sensor.ShapeDetector import ShapeDetector
+from Sensor.ArrowDetector import ArrowDetector
+from Sensor.Frame import Frame
+from Sensor.LineDetector import get_segments
+from Sensor.HoughController import HoughController
+from Constant import const
+
+# 영상 경로: 정답
+DOOR_CLIPS = {
+    "Sensor/src/door_test/E.h264": "E",
+    "Sensor/src/door_test/N.h264": "N",
+    "Sensor/src/door_test/S.h264": "S",
+    "Sensor/src/door_test/W.h264": "W",
+    "Sensor/src/door_test/doortest_E.h264": "E",
+}
+ROOM_CLIPS = {
+    "Sensor/src/alphabet/BLUE_A.h264": "A",
+    "Sensor/src/alphabet/BLUE_B.h264": "B",
+    "Sensor/src/alphabet/BLUE_D.h264": "D",
+    "Sensor/src/1116/black_room_B.mp4": "B",
+    "Sensor/src/1116/black_room_D.mp4": "D",
+}
+LINE_CLIPS = [
+    "Sensor/src/1116/yellow_line.mp4",
+    "Sensor/src/1116/green_room_A.mp4",
+]
+ARROW_CLIPS = {
+    "Sensor/src/arrow_test/arrow_left.h264": "LEFT",
+    "Sensor/src/arrow_test/arrow_right.h264": "RIGHT",
+    "Sensor/src/arrow_test/RIGHT.h264": "RIGHT",
+}
+
+
+class ClipStream:
+    """녹화 영상의 프레임을 FrameRingBuffer 처럼 latest() 로 하나씩 돌려주는 스트림"""
+
+    def __init__(self, path: str, size: tuple = (640, 480)):
+        self.frames = []
+        cap = cv2.VideoCapture(path)
+        while True:
+            ret, src = cap.read()
+            if not ret:
+                break
+            if src.shape[1::-1] != size:
+                src = cv2.resize(src, dsize=size)
+            self.frames.append(src)
+        cap.release()
+        # 경로가 틀렸거나 읽을 수 없는 영상을 프레임 0 장으로 조용히 넘기면 정확도 / 시간 결과가 틀어진다
+        if not self.frames:
+            raise FileNotFoundError("영상을 열 수 없습니다: %s" % path)
+        self.index = 0
+        self.qualities = [get_quality(src) for src in self.frames]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def latest(self) -> CapturedFrame:
+        src = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return CapturedFrame(self.index, time.monotonic(), src, self.qualities[(self.index - 1) % len(self.frames)])
+
+    def next_after(self, seq: int, timeout: float = None) -> CapturedFrame:
+        return self.latest()
+
+    def last(self, k: int) -> list:
+        return []
+
+    def read(self):
+        return self.latest().image
+
+    def stop(self):
+        pass
+
+
+def get_image_processor(size: tuple = None) -> ImageProcessor:
+    clip = next(iter(DOOR_CLIPS))
+    image_processor = ImageProcessor(video_path=clip, size=size)
+    image_processor._cam.stop()
+    return image_processor
+
+
+def collect_rois(image_processor: ImageProcessor, clips: dict, get_roi) -> list:
+    """각 영상의 모든 프레임에서 ROI 를 뽑아 (정답, roi) 리스트로 돌려준다. ROI 가 없는 프레임은 roi=None"""
+    samples = []
+    for path, answer in clips.items():
+        stream = ClipStream(path)
+        image_processor._cam = stream
+        for _ in range(len(stream)):
+            roi = get_roi()
+            samples.append((answer, None if roi is None else roi.copy()))
+    return samples
+
+
+def synthetic_samples(file_path: str, count: int = 20, seed: int = 0) -> list:
+    """템플릿 이미지를 조금씩 회전, 확대/축소, 흐리게 하고 노이즈를 넣어 (정답, 이미지) 리스트를 만든다."""
+    rng = np.random.default_rng(seed)
+    samples = []
+    detector = HashDetector(file_path=file_path, dim=(8, 8))
+    for name in detector.directions:
+        path = next(p for p in detector.file_lst if p.rsplit('.')[0] == name)
+        src = cv2.cvtColor(cv2.imread(file_path + path), cv2.COLOR_BGR2GRAY)
+        h, w = src.shape[:2]
+        for _ in range(count):
+            M = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-10, 10), rng.uniform(0.85, 1.1))
+            dst = cv2.warpAffine(src, M, (w, h), borderValue=255)
+            dst = cv2.GaussianBlur(dst, (0, 0), rng.uniform(0.5, 3))
+            dst = np.clip(dst + rng.normal(0, 25, dst.shape), 0, 255).astype(np.uint8)
+            samples.append((name, dst))
+    return samples
+
+
+def score(samples: list, detect) -> dict:
+    """detect(roi) -> 답 또는 None. 프레임 대비 ROI 검출률과 답 검출률, 검출 중 정답률, 1회 평균 시간(ms)"""
+    hit = correct = 0
+    elapsed = 0.0
+    rois = [(answer, roi) for answer, roi in samples if roi is not None]
+    for answer, roi in rois:
+        t = time.perf_counter()
+        result = detect(roi)
+        elapsed += time.perf_counter() - t
+        if result is not None:
+            hit += 1
+            correct += result == answer
+    return {
+        "roi": len(rois) / max(len(samples), 1),
+        "detect": hit / max(len(samples), 1),
+        "precision": correct / max(hit, 1),
+        "ms": 1000 * elapsed / max(len(rois), 1),
+    }
+
+
+def print_row(name: str, result: dict, extra: str = ""):
+    print(f"{name:>12} | roi {result['roi']:6.1%} | detect {result['detect']:6.1%} | precision {result['precision']:6.1%} | {result['ms']:7.3f} ms {extra}")
+
+
+def benchmark_hash(resolutions: list):
+    """평균 해시 해상도별 정확도 / 속도"""
+    image_processor = get_image_processor()
+    door = collect_rois(image_processor, DOOR_CLIPS, image_processor.get_door_alphabet_roi)
+    room = collect_rois(image_processor, ROOM_CLIPS, image_processor.get_alphabet_roi4room)
+    arrow = collect_rois(image_processor, ARROW_CLIPS, image_processor.get_arrow_roi)
+    door_synthetic = synthetic_samples('Sensor/EWSN/')
+    room_synthetic = synthetic_samples('Sensor/ABCD/')
+
+    for size in resolutions:
+        dim = (size, size)
+        door_detector = HashDetector(file_path='Sensor/EWSN/', dim=dim)
+        room_detector = HashDetector(file_path='Sensor/ABCD/', dim=dim)
+        arrow_detector = HashDetector(file_path='Sensor/src/arrow/', dim=dim)
+        door_detector_aug = HashDetector(file_path='Sensor/EWSN/', dim=dim, augment=True)
+        room_detector_aug = HashDetector(file_path='Sensor/ABCD/', dim=dim, augment=True)
+        print(f"--- hash {size}x{size} ({size * size // 8} bytes / template)")
+        print_row("door", score(door, lambda roi: door_detector.detect_alphabet_hash(roi, threshold=0.6)[0]))
+        print_row("room", score(room, lambda roi: room_detector.detect_alphabet_hash(roi, threshold=0.8)[0]))
+        print_row("arrow", score(arrow, lambda roi: arrow_detector.detect_arrow(roi)))
+        print_row("door(syn)", score(door_synthetic, lambda roi: door_detector.detect_alphabet_hash(roi, threshold=0.6)[0]))
+        print_row("room(syn)", score(room_synthetic, lambda roi: room_detector.detect_alphabet_hash(roi, threshold=0.8)[0]))
+        print_row("door(aug)", score(door, lambda roi: door_detector_aug.detect_alphabet_hash(roi, threshold=0.6)[0]))
+        print_row("room(aug)", score(room, lambda roi: room_detector_aug.detect_alphabet_hash(roi, threshold=0.8)[0]), f"({len(room_detector_aug.index)} hashes)")
+
+
+def benchmark_shape():
+    """모양 특징 검출기 vs 평균 해시 검출기 (ImageProcessor 와 같은 설정)"""
+    image_processor = get_image_processor()
+    door = collect_rois(image_processor, DOOR_CLIPS, image_processor.get_door_alphabet_roi)
+    room = collect_rois(image_processor, ROOM_CLIPS, image_processor.get_alphabet_roi4room)
+    door_synthetic = synthetic_samples('Sensor/EWSN/')
+    room_synthetic = synthetic_samples('Sensor/ABCD/')
+
+    engines = {
+        "hash": (
+            lambda roi: image_processor.hash_detector4door.detect_alphabet_hash(roi, threshold=0.6)[0],
+            lambda roi: image_processor.hash_detector4room.detect_alphabet_hash(roi, threshold=0.8)[0],
+        ),
+        "shape": (
+            lambda roi: image_processor.shape_detector4door.detect_alphabet(roi, threshold=const.SHAPE_THRESH4DOOR)[0],
+            lambda roi: image_processor.shape_detector4room.detect_alphabet(roi, threshold=const.SHAPE_THRESH4ROOM)[0],
+        ),
+    }
+    for engine, (detect4door, detect4room) in engines.items():
+        print(f"--- {engine}")
+        print_row("door", score(door, detect4door))
+        print_row("room", score(room, detect4room))
+        print_row("door(syn)", score(door_synthetic, detect4door))
+        print_row("room(syn)", score(room_synthetic, detect4room))
+
+
+def benchmark_arrow():
+    """모양 기반 화살표 방향 추정 vs 평균 해시, confidence 가 낮을 때만 해시로 넘기는 경우"""
+    image_processor = get_image_processor()
+    arrow = collect_rois(image_processor, ARROW_CLIPS, image_processor.get_arrow_roi)
+
+    def estimate_with_fallback(roi):
+        direction, confidence = ArrowDetector.estimate(roi)
+        if confidence < const.ARROW_CONFIDENCE_THRESH:
+            return image_processor.hash_detector4arrow.detect_arrow(roi)
+        return direction
+
+    confidences = [ArrowDetector.estimate(roi)[1] for _, roi in arrow if roi is not None]
+    fallback = sum(confidence < const.ARROW_CONFIDENCE_THRESH for confidence in confidences)
+    print_row("hash", score(arrow, image_processor.hash_detector4arrow.detect_arrow))
+    print_row("moment", score(arrow, lambda roi: ArrowDetector.estimate(roi)[0]))
+    print_row("fallback", score(arrow, estimate_with_fallback), f"({fallback}/{len(confidences)} to hash)")
+
+
+def benchmark_nodes():
+    """한 틱에서 선 검출과 코너 검출을 같이 할 때 Frame 노드별 평균 계산 시간 (ms)"""
+    image_processor = get_image_processor()
+    timings = {}
+    ticks = 0
+    for path in LINE_CLIPS:
+        stream = ClipStream(path)
+        image_processor._cam = stream
+        for _ in range(len(stream)):
+            frame = image_processor.hold_frame()
+            image_processor.line_tracing(color="YELLOW")
+            image_processor.get_yellow_line_corner()
+            image_processor.release_frame()
+            for name, elapsed in frame.timings.items():
+                timings[name] = timings.get(name, 0.0) + elapsed
+            ticks += 1
+    for name, elapsed in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"{name:22s} {elapsed / ticks * 1000:7.2f} ms")
+
+
+def to_reference(image_processor: ImageProcessor, pos: tuple) -> tuple:
+    """처리 해상도 픽셀 좌표를 기준 해상도(640x480) 픽셀 좌표로"""
+    return None if pos is None else (pos[0] / image_processor.scale, pos[1] / image_processor.scale)
+
+
+# 판단 이름: (영상, 판단 함수). 위치를 돌려주는 판단은 기준 해상도 좌표로 비교한다
+DECISIONS = {
+    "walk_info": (LINE_CLIPS, lambda ip: ip.line_checker(ip.line_tracing(color="YELLOW")[0])),
+    "walk_info(ROI)": (LINE_CLIPS, lambda ip: ip.line_checker(ip.line_tracing(color="YELLOW", ROI=True)[0])),
+    "corner": (LINE_CLIPS, lambda ip: to_reference(ip, ip.get_yellow_line_corner())),
+    "green_area": (LINE_CLIPS, lambda ip: ip.check_area_color()),
+    "milk(RED)": (LINE_CLIPS, lambda ip: to_reference(ip, ip.get_milk_info(color="RED"))),
+    "milk(BLUE)": (list(ROOM_CLIPS), lambda ip: to_reference(ip, ip.get_milk_info(color="BLUE"))),
+    "out_of_black": (list(ROOM_CLIPS), lambda ip: ip.is_out_of_black()),
+    "door": (list(DOOR_CLIPS), lambda ip: ip.get_door_alphabet_using_iou()),
+    "room": (list(ROOM_CLIPS), lambda ip: ip.get_alphabet_info4room()),
+    "arrow": (list(ARROW_CLIPS), lambda ip: ip.get_arrow_direction()),
+}
+
+
+def same_decision(a, b, tolerance: float = 20) -> bool:
+    """위치는 기준 해상도에서 tolerance 픽셀 안이면 같은 판단으로 본다"""
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return abs(a[0] - b[0]) <= tolerance and abs(a[1] - b[1]) <= tolerance
+    return a == b
+
+
+def run_decisions(image_processor: ImageProcessor, streams: dict, decisions: dict = None) -> dict:
+    """:return: 판단 이름: (프레임별 결과, 평균 시간 ms). 프레임 축소 시간은 "frame" 에 따로 잰다"""
+    results = {}
+    frame_time, frame_count = 0.0, 0
+    for name, (clips, decide) in (decisions or DECISIONS).items():
+        decisions, elapsed = [], 0.0
+        for path in clips:
+            stream = streams[path]
+            stream.index = 0
+            image_processor._cam = stream
+            for _ in range(len(stream)):
+                start = time.perf_counter()
+                image_processor.hold_frame()
+                frame_time += time.perf_counter() - start
+                frame_count += 1
+                image_processor._result_cache.clear()
+                start = time.perf_counter()
+                decisions.append(decide(image_processor))
+                elapsed += time.perf_counter() - start
+                image_processor.release_frame()
+        results[name] = (decisions, elapsed / len(decisions) * 1000)
+    results["frame"] = (None, frame_time / frame_count * 1000)
+    return results
+
+
+def benchmark_resolution(sizes: list):
+    """처리 해상도별 판단 시간 (ms) 과 첫 번째 해상도와 판단이 같은 비율"""
+    paths = {path for clips, _ in DECISIONS.values() for path in clips}
+    streams = {path: ClipStream(path) for path in paths}
+    results = {size: run_decisions(get_image_processor(size), streams) for size in sizes}
+    base = results[sizes[0]]
+    print(f"{'':16s}" + "".join(f"{'%dx%d' % size:>12s}" for size in sizes) + "   agreement")
+    for name in base:
+        times = "".join(f"{results[size][name][1]:10.2f}ms" for size in sizes)
+        agreements = []
+        if base[name][0] is not None:
+            for size in sizes[1:]:
+                pairs = list(zip(base[name][0], results[size][name][0]))
+                agreements.append(f"{sum(same_decision(a, b) for a, b in pairs) / len(pairs):.0%}")
+        print(f"{name:16s}{times}   {' '.join(agreements)}")
+
+
+LINE_DECISIONS = {
+    "walk_info": DECISIONS["walk_info"],
+    "walk_info(ROI)": DECISIONS["walk_info(ROI)"],
+    # 세로선 x, 가로선 y (기준 해상도 좌표)
+    "V_X, H_Y": (LINE_CLIPS, lambda ip: to_reference(ip, (lambda line_info: (line_info.v_x, line_info.h_y))(
+        ip.line_tracing(color="YELLOW")[0]))),
+    "green_line": (LINE_CLIPS, lambda ip: to_reference(ip, (lambda line_info: ((line_info.all_x0 + line_info.all_x1) / 2, (line_info.all_y0 + line_info.all_y1) / 2))(
+        ip.line_tracing(color="GREEN")[0]))),
+}
+
+
+def benchmark_pyramid(levels: list):
+    """선분을 1/2^level 해상도에서 찾고 원래 해상도에서 다듬을 때의 선 검출 시간 (ms) 과 level 0 과 판단이 같은 비율"""
+    streams = {path: ClipStream(path) for path in LINE_CLIPS}
+    image_processor = get_image_processor()
+    results = {}
+    for level in levels:
+        for color in ["yellow", "green"]:
+            Frame.register(color + "_segments", lambda frame, color=color, level=level: get_segments(frame, color, level))
+        results[level] = run_decisions(image_processor, streams, LINE_DECISIONS)
+    base = results[levels[0]]
+    print(f"{'level':16s}" + "".join(f"{level:>12d}" for level in levels) + "   agreement")
+    for name in LINE_DECISIONS:
+        times = "".join(f"{results[level][name][1]:10.2f}ms" for level in levels)
+        agreements = []
+        for level in levels[1:]:
+            pairs = list(zip(base[name][0], results[level][name][0]))
+            agreements.append(f"{sum(same_decision(a, b) for a, b in pairs) / len(pairs):.0%}")
+        print(f"{name:16s}{times}   {' '.join(agreements)}")
+
+
+def benchmark_tracking():
+    """LineTracker 로 예측한 영역에서만 선분을 찾을 때의 선 검출 시간 (ms) 과 화면 전체에서 찾을 때와 판단이 같은 비율"""
+    streams = {path: ClipStream(path) for path in LINE_CLIPS}
+    image_processor = get_image_processor()
+    results = {}
+    for tracking in [False, True]:
+        image_processor.line_tracking = tracking
+        image_processor.line_trackers.clear()
+        results[tracking] = run_decisions(image_processor, streams, LINE_DECISIONS)
+    print(f"{'':16s}{'full':>12s}{'tracking':>12s}   agreement")
+    for name in LINE_DECISIONS:
+        pairs = list(zip(results[False][name][0], results[True][name][0]))
+        agreement = sum(same_decision(a, b) for a, b in pairs) / len(pairs)
+        print(f"{name:16s}{results[False][name][1]:10.2f}ms{results[True][name][1]:10.2f}ms   {agreement:.0%}")
+
+
+def benchmark_scanline():
+    """곧은 선을 행 무게중심으로 맞추는 빠른 검출(fast=True)의 선 검출 시간 (ms) 과 Hough 로만 찾을 때와 판단이 같은 비율"""
+    streams = {path: ClipStream(path) for path in LINE_CLIPS}
+    image_processor = get_image_processor()
+    results = {}
+    for fast in [False, True]:
+        results[fast] = run_decisions(image_processor, streams, {
+            "walk_info": (LINE_CLIPS, lambda ip: ip.line_checker(ip.line_tracing(color="YELLOW", fast=fast)[0])),
+            "walk_info(ROI)": (LINE_CLIPS, lambda ip: ip.line_checker(ip.line_tracing(color="YELLOW", ROI=True, fast=fast)[0])),
+            "V_X": (LINE_CLIPS, lambda ip: to_reference(ip, (lambda line_info: (line_info.v_x0, line_info.v_x1))(ip.line_tracing(color="YELLOW", fast=fast)[0]))),
+        })
+    print(f"{'':16s}{'hough':>12s}{'scanline':>12s}   agreement")
+    for name in results[False]:
+        if results[False][name][0] is None:
+            continue
+        pairs = list(zip(results[False][name][0], results[True][name][0]))
+        agreement = sum(same_decision(a, b) for a, b in pairs) / len(pairs)
+        print(f"{name:16s}{results[False][name][1]:10.2f}ms{results[True][name][1]:10.2f}ms   {agreement:.0%}")
+
+
+def segment_count(image_processor: ImageProcessor, node: str, controller) -> int:
+    """이번 프레임에서 HoughLinesP 가 찾은 (자르기 전) 선분 수"""
+    image_processor.get_frame(min_quality=const.LINE_MIN_QUALITY).get(node)
+    return controller.count
+
+
+def benchmark_hough(band: tuple, corner_band: tuple):
+    """HoughController 로 선분 수를 목표 범위 안에 둘 때의 판단 시간 (ms), 고정 파라미터일 때와 판단이 같은 비율, 선분 수와 gain"""
+    streams = {path: ClipStream(path) for path in LINE_CLIPS}
+    image_processor = get_image_processor()
+    shape = (image_processor.height, image_processor.width)
+    controllers = {"yellow_segments": HoughController.of("yellow", shape), "green_segments": HoughController.of("green", shape),
+                   "corner_segments": HoughController.of("corner", shape, band=const.CORNER_SEGMENT_BAND)}
+    decisions = dict(LINE_DECISIONS, corner=DECISIONS["corner"])
+    for node, controller in controllers.items():
+        decisions[node] = (LINE_CLIPS, lambda ip, node=node, controller=controller: segment_count(ip, node, controller))
+    results, gains = {}, {}
+    for adaptive in [False, True]:
+        for node, controller in controllers.items():
+            controller.band = corner_band if node == "corner_segments" else band
+            controller.max_segments = 2 * controller.band[1]
+            controller.adaptive = adaptive
+            controller.reset()
+        results[adaptive] = run_decisions(image_processor, streams, decisions)
+        gains[adaptive] = {node: controller.gain for node, controller in controllers.items()}
+    print(f"{'':16s}{'fixed':>12s}{'adaptive':>12s}   agreement")
+    for name in decisions:
+        if name in controllers:
+            continue
+        pairs = list(zip(results[False][name][0], results[True][name][0]))
+        agreement = sum(same_decision(a, b) for a, b in pairs) / len(pairs)
+        print(f"{name:16s}{results[False][name][1]:10.2f}ms{results[True][name][1]:10.2f}ms   {agreement:.0%}")
+    print(f"{'segments':16s}{'fixed':>12s}{'adaptive':>12s}   band, gain (last frame)")
+    for node, controller in controllers.items():
+        counts = [np.array(results[adaptive][node][0]) for adaptive in [False, True]]
+        print(f"{node:16s}" + "".join(f"{count.mean():6.1f}/{count.max():4d}" for count in counts)
+              + f"   {controller.band}, {gains[True][node]:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", choices=["hash", "shape", "arrow", "nodes", "resolution", "pyramid", "tracking", "scanline", "hough"])
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[512, 256, 128, 64, 32, 16])
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 1, 2], help="pyramid: 선분 검출 해상도 단계")
+    parser.add_argument("--widths", type=int, nargs="+", default=[640, 320], help="resolution: 처리 해상도 폭 (4:3)")
+    parser.add_argument("--band", type=int, nargs=2, default=list(const.HOUGH_SEGMENT_BAND), help="hough: 선 검출 목표 선분 수")
+    parser.add_argument("--corner-band", type=int, nargs=2, default=list(const.CORNER_SEGMENT_BAND), help="hough: 코너 검출 목표 선분 수")
+    args = parser.parse_args()
+
+    if args.target == "hash":
+        benchmark_hash(args.resolutions)
+    elif args.target == "shape":
+        benchmark_shape()
+    elif args.target == "arrow":
+        benchmark_arrow()
+    elif args.target == "nodes":
+        benchmark_nodes()
+    elif args.target == "resolution":
+        benchmark_resolution([(width, width * 3 // 4) for width in args.widths])
+    elif args.target == "pyramid":
+        benchmark_pyramid(args.levels)
+    elif args.target == "tracking":
+        benchmark_tracking()
+    elif args.target == "scanline":
+        benchmark_scanline()
+    elif args.target == "hough":
+        benchmark_hough(tuple(args.band), tuple(args.corner_band))
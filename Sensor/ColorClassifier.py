@@ -0,0 +1,102 @@
+import os
+import hashlib
+import cv2
+import numpy as np
+from Constant import const
+from Sensor.MaskWorkspace import MaskWorkspace
+
+
+class ColorClassifier:
+    """Constant.py 의 HSV 범위들로부터 BGR -> 색상 클래스 lookup table 을 만들어 두고,
+    프레임 한 장을 한 번만 훑어서 HSV 범위별 비트가 켜진 label 이미지(uint8)를 만든다.
+    각 mask 는 label 이미지에서 해당 비트만 읽으면 되므로 cvtColor, inRange 가 필요 없다.
+    """
+
+    CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "color_table.npz")
+
+    # 클래스 이름: HSV 범위 리스트 (빨간색처럼 hue 0 을 감싸는 경우는 범위 두 개)
+    CLASSES = {
+        "YELLOW": [const.YELLOW_RANGE],
+        "GREEN": [const.GREEN_RANGE],
+        "BLACK": [const.BLACK_RANGE],
+        "RED_ALPHABET": [const.RED_ALPHABET_RANGE1, const.RED_ALPHABET_RANGE2],
+        "BLUE_ALPHABET": [const.BLUE_ALPHABET_RANGE],
+        "RED_BOX": [const.RED_BOX_RANGE1, const.RED_BOX_RANGE2],
+        "BLUE_BOX": [const.BLUE_BOX_RANGE],
+    }
+    # 비트는 클래스가 아니라 서로 다른 HSV 범위마다 하나씩 둔다. 범위가 여러 개인 클래스는 범위별 mask 를
+    # 따로 열기(open)한 뒤 OR 해야 예전 결과와 같으므로 (open(A | B) != open(A) | open(B)) 범위를 합쳐두지 않는다.
+    # 범위가 같은 클래스(RED_ALPHABET 과 RED_BOX 등)는 비트를 같이 쓴다
+    RANGES = []
+    for _ranges in CLASSES.values():
+        for _range in _ranges:
+            if _range not in RANGES:
+                RANGES.append(_range)
+    # 클래스 이름: 범위마다의 비트 리스트
+    BITS = {}
+    for _name, _ranges in CLASSES.items():
+        BITS[_name] = []
+        for _range in _ranges:
+            BITS[_name].append(1 << RANGES.index(_range))
+    del _name, _ranges, _range
+    DTYPE = np.uint8 if len(RANGES) <= 8 else np.uint16
+
+    _table = None
+    workspace = MaskWorkspace()
+
+    @classmethod
+    def get_key(cls) -> str:
+        return hashlib.md5(repr((cls.RANGES, np.dtype(cls.DTYPE).str)).encode()).hexdigest()
+
+    @classmethod
+    def build_table(cls) -> np.ndarray:
+        # index = b | g << 8 | r << 16 (BGRA 픽셀을 little-endian uint32 로 읽었을 때의 하위 24비트)
+        table = np.zeros((256, 256, 256), dtype=cls.DTYPE)  # [r, g, b]
+        g, b = np.mgrid[0:256, 0:256].astype(np.uint8)
+        slab = np.empty((256, 256, 3), dtype=np.uint8)
+        slab[:, :, 0] = b
+        slab[:, :, 1] = g
+        for r in range(256):
+            slab[:, :, 2] = r
+            hsv = cv2.cvtColor(slab, cv2.COLOR_BGR2HSV)
+            labels = table[r]
+            for i, (lower, upper) in enumerate(cls.RANGES):
+                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+                labels[mask > 0] |= 1 << i
+        return table.reshape(-1)
+
+    @classmethod
+    def get_table(cls) -> np.ndarray:
+        """lookup table 을 반환한다. 디스크 캐시가 없거나 Constant 의 범위가 바뀌었으면 다시 만든다."""
+        if cls._table is not None:
+            return cls._table
+        key = cls.get_key()
+        if os.path.exists(cls.CACHE_PATH):
+            try:
+                cache = np.load(cls.CACHE_PATH)
+                if str(cache["key"]) == key:
+                    cls._table = cache["table"]
+                    return cls._table
+            except (OSError, KeyError, ValueError):
+                pass
+        cls._table = cls.build_table()
+        try:
+            np.savez_compressed(cls.CACHE_PATH, key=key, table=cls._table)
+        except OSError:
+            print("color table 캐시를 저장하지 못했습니다:", cls.CACHE_PATH)
+        return cls._table
+
+    @classmethod
+    def classify(cls, src: np.ndarray) -> np.ndarray:
+        table = cls.get_table()
+        shape = src.shape[:2]
+        bgra = cv2.cvtColor(src, cv2.COLOR_BGR2BGRA, dst=cls.workspace.get_buffer("bgra", shape + (4,)))
+        index = bgra.view("<u4").reshape(shape)
+        np.bitwise_and(index, 0x00FFFFFF, out=index)
+        return np.take(table, index)
+
+    @classmethod
+    def get_mask(cls, labels: np.ndarray, bit: int, dst: np.ndarray = None) -> np.ndarray:
+        """label 이미지에서 bit (BITS 의 한 값) 가 켜진 픽셀을 255 로 하는 mask"""
+        bits = cv2.bitwise_and(labels, bit, dst=dst if labels.dtype == np.uint8 else None)
+        return cv2.compare(bits, 0, cv2.CMP_GT, dst=dst)
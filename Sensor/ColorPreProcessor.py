@@ -1,6 +1,9 @@
 import cv2
 import numpy as np
 from Constant import const
+from Sensor.Frame import Frame
+from Sensor.ColorClassifier import ColorClassifier
+from Sensor.MaskWorkspace import MaskWorkspace
 # background 가 흰색이라 hue 값만으로 pixel rate 판단하면 위험할 수 있기때문에 테스트 해보고 수정할 것
 
 
@@ -21,40 +24,64 @@ COLORS = {
 
 class ColorPreProcessor():
 
+    workspace = MaskWorkspace()
+
     @classmethod
     def get_blue_mask4alphabet(cls, src: np.array):
-        return cls.get_color_mask(src, const=const.BLUE_ALPHABET_RANGE)
+        return cls.get_class_mask(src, name="BLUE_ALPHABET")
 
 
     @classmethod
     def get_blue_mask4box(cls, src: np.array):
-        return cls.get_color_mask(src, const=const.BLUE_BOX_RANGE)
+        return cls.get_class_mask(src, name="BLUE_BOX")
 
     @classmethod
     def get_red_mask4alphabet(cls, src: np.array):
-        l = cls.get_color_mask(src, const=const.RED_ALPHABET_RANGE1)
-        r = cls.get_color_mask(src, const=const.RED_ALPHABET_RANGE2)
-        return cv2.bitwise_or(l, r)
+        return cls.get_class_mask(src, name="RED_ALPHABET")
 
     @classmethod
     def get_red_mask4box(cls, src: np.array):
-        l = cls.get_color_mask(src, const=const.RED_BOX_RANGE1)
-        r = cls.get_color_mask(src, const=const.RED_BOX_RANGE2)
-        return cv2.bitwise_or(l, r)
+        return cls.get_class_mask(src, name="RED_BOX")
+
+    @classmethod
+    def allocate_workspace(cls, shape: tuple):
+        """카메라 해상도(shape = (h, w))에 맞춰 클래스별 mask 버퍼를 미리 할당한다."""
+        names = []
+        for name, bits in ColorClassifier.BITS.items():
+            names += [name, name + "_bits"] + ["%s_%d" % (name, i) for i in range(1, len(bits))]
+        cls.workspace.allocate(shape, names)
+        ColorClassifier.workspace.allocate(tuple(shape) + (4,), ["bgra"])
+
+    @classmethod
+    def get_class_mask(cls, src: np.array, name: str):
+        """ColorClassifier 의 label 이미지에서 name 클래스 mask 를 읽어온다. (cvtColor, inRange 없음)
+        범위가 두 개인 클래스(빨간색)는 예전 get_color_mask 두 번 + OR 처럼 범위마다 열기(open)한 뒤 OR 한다.
+        """
+        labels = Frame.of(src).labels
+        shape = labels.shape
+        mask = None
+        for i, bit in enumerate(ColorClassifier.BITS[name]):
+            part = ColorClassifier.get_mask(labels, bit, dst=cls.workspace.get_buffer(name + "_bits", shape))
+            buffer = cls.workspace.get_buffer(name if i == 0 else "%s_%d" % (name, i), shape)
+            part = cv2.morphologyEx(part, cv2.MORPH_OPEN, cls.workspace.kernel, dst=buffer)
+            mask = part if mask is None else cv2.bitwise_or(mask, part, dst=mask)
+        return mask
 
 
     @classmethod
     def get_color_mask(cls, src:np.array, const:list):
-        k = cv2.getStructuringElement(cv2.MORPH_CROSS, (5,5))
-        hsv = cv2.cvtColor(src, cv2.COLOR_BGR2HSV)
-        lower = np.array(const[0])
-        upper = np.array(const[1])
-        mask = cv2.inRange(hsv, lower, upper)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, k)
+        # src 가 Frame 이면 이미 계산된 hsv 를 재사용한다
+        hsv = Frame.of(src).hsv
+        shape = hsv.shape[:2]
+        lower, upper = cls.workspace.get_bounds(const)
+        name = str(const)
+        mask = cv2.inRange(hsv, lower, upper, dst=cls.workspace.get_buffer(name + "_bits", shape))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, cls.workspace.kernel, dst=cls.workspace.get_buffer(name, shape))
         return mask
 
     @classmethod
     def get_alphabet_mask(cls, src: np.array) -> np.array:
+        src = Frame.of(src)
         red_mask = cls.get_red_mask4alphabet(src)
         blue_mask = cls.get_blue_mask4alphabet(src)
         return cv2.bitwise_or(red_mask, blue_mask)
@@ -65,7 +92,7 @@ class ColorPreProcessor():
 
     @classmethod
     def get_green_mask(cls, src: np.array) -> np.array:
-        return cls.get_color_mask(src, const=const.GREEN_RANGE)
+        return cls.get_class_mask(src, name="GREEN")
 
     @classmethod
     def get_mean_value_for_non_zero(cls, src: np.array) -> int:
@@ -74,6 +101,7 @@ class ColorPreProcessor():
 
     @classmethod
     def get_red_or_blue4hue(cls, src: np.array) -> str:
+        src = Frame.of(src)
         red_mask = ColorPreProcessor.get_red_mask4alphabet(src)
         blue_mask = ColorPreProcessor.get_blue_mask4alphabet(src)
         answer = "RED" if np.count_nonzero(red_mask) > np.count_nonzero(blue_mask) else "BLUE"
@@ -81,6 +109,7 @@ class ColorPreProcessor():
 
     @classmethod
     def get_red_or_blue(cls, src: np.array) -> str:
+        src = Frame.of(src)
         red_mask = ColorPreProcessor.get_red_mask4alphabet(src)
         blue_mask = ColorPreProcessor.get_blue_mask4alphabet(src)
         answer = "RED" if np.count_nonzero(red_mask) > np.count_nonzero(blue_mask) else "BLUE"
@@ -89,8 +118,15 @@ class ColorPreProcessor():
 
     @classmethod
     def get_yellow_mask(cls, src:np.array) -> np.array:
-        return cls.get_color_mask(src, const=const.YELLOW_RANGE)
+        return cls.get_class_mask(src, name="YELLOW")
 
     @classmethod
     def get_black_mask(cls, src:np.array) -> np.array:
-        return cls.get_color_mask(src, const=const.BLACK_RANGE)
+        return cls.get_class_mask(src, name="BLACK")
+
+
+# 선 / 코너 검출이 같은 프레임에서 같은 mask 를 다시 만들지 않도록 Frame 노드로 등록한다.
+# workspace 버퍼는 다음 요청 때 덮어써지므로 노드에는 복사본을 둔다
+Frame.register("yellow_mask", lambda frame: ColorPreProcessor.get_yellow_mask(frame).copy())
+Frame.register("green_mask", lambda frame: ColorPreProcessor.get_green_mask(frame).copy())
+Frame.register("black_mask", lambda frame: ColorPreProcessor.get_black_mask(frame).copy())
@@ -7,15 +7,19 @@ import os
 import math
 from imutils import auto_canny
 from Sensor.ColorPreProcessor import ColorPreProcessor
+from Sensor.Frame import Frame
+from Sensor.HoughController import HoughController
+from Constant import const
 
 
 class CornerFinder():
     @classmethod
-    def hough_lines(cls, image):
+    def hough_lines(cls, image, scale: float = 1.0):
+        """scale: 처리 해상도 배율. 투표 수와 길이는 기준 해상도(640x480)에서 정한 값이다 (get_corner_segments 와 같다)"""
         image_edges = auto_canny(image)
         houghed_lns = cv2.HoughLinesP(image_edges, rho=2, theta=np.pi / 180,
-                                      threshold=50, lines=np.array([]),
-                                      minLineLength=20, maxLineGap=100)
+                                      threshold=round(50 * scale), lines=np.array([]),
+                                      minLineLength=round(20 * scale), maxLineGap=round(100 * scale))
         return houghed_lns
 
     @classmethod
@@ -119,17 +123,17 @@ class CornerFinder():
 
     @classmethod
     def get_yellow_line_corner_pos(cls, src, visualization: bool = False):
+        frame = Frame.of(src)
+        src = frame.src
         pos = None
 
         if visualization:
             h, w = src.shape[:2]
             canvas = src.copy()
 
-        yellow_mask = ColorPreProcessor.get_yellow_mask(src)
-
-        masked = cv2.bitwise_and(src,src,mask=yellow_mask)
-        canny = auto_canny(masked)
-        lines = cv2.HoughLinesP(canny, 2, np.pi / 180, threshold=50, minLineLength=50, maxLineGap=60)
+        # yellow_mask 는 LineDetector 와 공유하는 Frame 노드
+        masked = frame.get("yellow_masked")
+        lines = frame.get("corner_segments")
         if lines is not None:
             if visualization:
                 for line in lines:
@@ -159,24 +163,27 @@ class CornerFinder():
                     pos = tuple(intersect_pt)
                     if visualization :
                         center = (cx, cy) = (w // 2, h // 2)
+                        # 눈금 간격(기준 해상도에서 10픽셀)과 높이도 처리 해상도 배율을 곱한다
                         x_range = 10
-                        y_range = 20
-                        if cx-x_range*10 <= pos[0] <= cx+x_range*10 :
+                        x_step = 10 * frame.scale
+                        y_range = round(20 * frame.scale)
+                        if cx - round(x_range * x_step) <= pos[0] <= cx + round(x_range * x_step):
                             cv2.circle(canvas, pos, 10, (255, 0, 0), -1)
                             cv2.putText(canvas, "IN", pos, cv2.FONT_HERSHEY_SIMPLEX, 1,(255, 0, 0), thickness=2)
                         else:
                             cv2.circle(canvas, pos, 10, (0, 0, 255), -1)
                             cv2.putText(canvas, "NOT IN", pos, cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), thickness=2)
 
-                        cv2.line(canvas, (cx - x_range * 10, cy), (cx + x_range * 10, cy), (255, 0, 0), 2)
+                        cv2.line(canvas, (cx - round(x_range * x_step), cy), (cx + round(x_range * x_step), cy), (255, 0, 0), 2)
                         cv2.circle(canvas, center, 10, (255, 0, 0), 2)
                         for x_r in range(x_range + 1):
                             if x_r == 0 or x_r == x_range:
-                                x_r *= 10
+                                label = x_r * 10
+                                x_r = round(x_r * x_step)
                                 if x_r != 0:
-                                    cv2.putText(canvas, "-%d" % x_r, (cx - x_r, cy - y_range), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                                    cv2.putText(canvas, "-%d" % label, (cx - x_r, cy - y_range), cv2.FONT_HERSHEY_SIMPLEX, 1,
                                                 (255, 0, 0), thickness=2)
-                                    cv2.putText(canvas, "-%d" % x_r, (cx + x_r, cy - y_range), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                                    cv2.putText(canvas, "-%d" % label, (cx + x_r, cy - y_range), cv2.FONT_HERSHEY_SIMPLEX, 1,
                                                 (255, 0, 0), thickness=2)
                                 else:
                                     cv2.putText(canvas, "0", (cx, cy - y_range), cv2.FONT_HERSHEY_SIMPLEX, 1,
@@ -186,7 +193,7 @@ class CornerFinder():
                                 cv2.line(canvas, (cx + x_r, cy - y_range), (cx + x_r, cy + y_range), (255, 0, 0), 2)
                             else:
                                 y_r = y_range // 2
-                                x_r *= 10
+                                x_r = round(x_r * x_step)
                                 cv2.line(canvas, (cx - x_r, cy - y_r), (cx - x_r, cy + y_r), (255, 0, 0), 1)
                                 cv2.line(canvas, (cx + x_r, cy - y_r), (cx + x_r, cy + y_r), (255, 0, 0), 1)
 
@@ -197,6 +204,19 @@ class CornerFinder():
 
         return pos
 
+def get_corner_segments(frame: Frame) -> np.ndarray:
+    controller = HoughController.of("corner", frame.shape, band=const.CORNER_SEGMENT_BAND)
+    threshold, min_length = controller.get_params(50, 50, frame.scale)
+    segments = cv2.HoughLinesP(frame.get("yellow_masked_edges"), 2, np.pi / 180, threshold=threshold,
+                               minLineLength=min_length, maxLineGap=round(60 * frame.scale))
+    return controller.update(segments)
+
+
+# 노란 영역만 남긴 컬러 이미지 -> auto canny -> 코너용 선분 (LineDetector 보다 짧은 선분까지 찾는다)
+Frame.register("yellow_masked", lambda frame: cv2.bitwise_and(frame.src, frame.src, mask=frame.get("yellow_mask")))
+Frame.register("yellow_masked_edges", lambda frame: auto_canny(frame.get("yellow_masked")))
+Frame.register("corner_segments", get_corner_segments)
+
 if __name__ == "__main__" :
 
     from imutils.video import FileVideoStream
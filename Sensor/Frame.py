@@ -0,0 +1,116 @@
+import time
+import cv2
+import numpy as np
+from Sensor.ColorClassifier import ColorClassifier
+from Sensor.ResultCache import ResultCache
+
+
+class Frame:
+    """카메라에서 받아온 이미지 한 장과 그로부터 파생되는 색공간 변환 결과를 묶어두는 객체.
+    hsv, hls, l, gray, labels 는 처음 요청될 때 한 번만 계산하고, 이후에는 모든 검출기가 캐시된 값을 공유한다.
+
+    그 뒤의 중간 결과(yellow_mask -> yellow_edges -> yellow_segments 등)는 이름 붙은 노드로 등록해두고 get(name) 으로 받는다.
+    노드는 자기가 필요한 노드를 frame.get 으로 요청하므로 의존 관계가 그대로 DAG 가 되고,
+    각 노드는 프레임마다 한 번만 계산되며 계산 시간이 timings 에 남는다.
+    새 검출기는 이미 등록된 노드를 요청해서 같은 프레임의 결과를 재사용한다.
+    """
+
+    # 노드 이름: 계산 함수 (Frame 을 받아 결과를 돌려준다). 검출기 모듈이 import 될 때 Frame.register 로 추가한다
+    nodes = {}
+
+    def __init__(self, src: np.ndarray, parent=None, window: tuple = None, seq: int = None, timestamp: float = None,
+                 scale: float = 1.0):
+        """
+        :param seq, timestamp: FrameRingBuffer 의 캡처 번호와 캡처 시각 (time.monotonic)
+        :param scale: 기준 해상도(const.REFERENCE_SIZE) 대비 이 프레임의 배율. 노드는 픽셀 단위 파라미터에 곱해서 쓴다
+        """
+        self.src = src
+        self.seq = seq if parent is None else parent.seq
+        self.timestamp = timestamp if parent is None else parent.timestamp
+        self.scale = scale if parent is None else parent.scale
+        self._parent = parent
+        self._window = window  # parent 기준 (y0, y1, x0, x1)
+        self._cache = {}
+        # 노드 이름: 계산에 걸린 시간 (초, 안에서 처음 계산한 다른 노드의 시간은 뺀 값)
+        self.timings = {}
+        self._nested_time = 0.0
+
+    @classmethod
+    def register(cls, name: str, compute):
+        """compute(frame) 으로 계산되는 노드를 등록한다. 이미 있는 이름이면 덮어쓴다."""
+        cls.nodes[name] = compute
+
+    def get(self, name: str):
+        """등록된 노드의 결과. 처음 요청될 때만 계산한다."""
+        if name not in self._cache:
+            self._compute(name, lambda: Frame.nodes[name](self))
+        return self._cache[name]
+
+    def _compute(self, name: str, compute):
+        outer_nested_time, self._nested_time = self._nested_time, 0.0
+        start = time.perf_counter()
+        self._cache[name] = compute()
+        elapsed = time.perf_counter() - start
+        # hsv 같은 속성을 노드 이름으로 요청하면 안에서 이미 기록되므로 그 값을 둔다
+        self.timings.setdefault(name, elapsed - self._nested_time)
+        self._nested_time = outer_nested_time + elapsed
+
+    @classmethod
+    def of(cls, src):
+        """np.ndarray 또는 Frame 을 받아 Frame 으로 돌려준다."""
+        return src if isinstance(src, Frame) else cls(src)
+
+    @property
+    def shape(self):
+        return self.src.shape
+
+    @property
+    def age(self) -> float:
+        """캡처된 뒤 지난 시간 (초). 캡처 시각을 모르면 0"""
+        return time.monotonic() - self.timestamp if self.timestamp is not None else 0.0
+
+    def crop(self, y0: int, y1: int, x0: int, x1: int):
+        """부분 영역 Frame. 파생 이미지는 부모 Frame 의 결과를 잘라서 재사용한다."""
+        return Frame(self.src[y0:y1, x0:x1], parent=self, window=(y0, y1, x0, x1))
+
+    def _get(self, name: str, compute):
+        if name not in self._cache:
+            if self._parent is not None:
+                y0, y1, x0, x1 = self._window
+                self._cache[name] = getattr(self._parent, name)[y0:y1, x0:x1]
+            else:
+                self._compute(name, compute)
+        return self._cache[name]
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self._get("hsv", lambda: cv2.cvtColor(self.src, cv2.COLOR_BGR2HSV))
+
+    @property
+    def hls(self) -> np.ndarray:
+        return self._get("hls", lambda: cv2.cvtColor(self.src, cv2.COLOR_BGR2HLS))
+
+    @property
+    def l(self) -> np.ndarray:
+        return self._get("l", lambda: cv2.extractChannel(self.hls, 1))
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._get("gray", lambda: cv2.cvtColor(self.src, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def signature(self) -> np.ndarray:
+        """같은 장면인지 비교하기 위한 32x24 gray 서명 (ResultCache). 잘라낸 Frame 은 자기 영역으로 따로 만든다."""
+        if "signature" not in self._cache:
+            self._cache["signature"] = ResultCache.get_signature(self.gray)
+        return self._cache["signature"]
+
+    @property
+    def labels(self) -> np.ndarray:
+        """ColorClassifier 의 클래스 비트가 담긴 label 이미지"""
+        return self._get("labels", lambda: ColorClassifier.classify(self.src))
+
+
+# 색공간 변환도 노드 이름으로 요청할 수 있게 등록해둔다
+for _name in ["hsv", "hls", "l", "gray", "labels"]:
+    Frame.register(_name, lambda frame, name=_name: getattr(frame, name))
@@ -0,0 +1,130 @@
+import time
+from collections import namedtuple
+from threading import Thread, Condition
+
+import cv2
+import numpy as np
+from Constant import const
+
+# seq: 1 부터 1씩 늘어나는 캡처 번호, timestamp: 캡처한 시각 (time.monotonic), image: 링 버퍼 슬롯 (복사본이 아님)
+# quality: 선명도 (get_quality), 흔들려서 번진 프레임일수록 작다
+CapturedFrame = namedtuple("CapturedFrame", ["seq", "timestamp", "image", "quality"])
+
+
+def get_quality(image: np.ndarray) -> float:
+    """축소한 gray 이미지의 Laplacian 분산. 장면마다 값의 범위가 다르므로 최근 프레임끼리 비교하는 데 쓴다."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, dsize=const.QUALITY_SIZE, interpolation=cv2.INTER_AREA)
+    _, stddev = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+    return float(stddev[0, 0] ** 2)
+
+
+class FrameRingBuffer:
+    """WebcamVideoStream 대신 쓰는 캡처 스트림.
+    미리 할당해둔 슬롯들을 돌아가며 cap.read(image=slot) 으로 덮어쓰고, 프레임마다 캡처 번호(seq)와 시각을 붙인다.
+    읽는 쪽은 latest / next_after / last 로 복사 없이 슬롯을 그대로 받으므로,
+    받은 프레임은 슬롯 수만큼 새 프레임이 들어오기 전까지만 유효하다. (30fps, 슬롯 8개면 약 0.27초)
+    그보다 오래 들고 있을 이미지는 복사해서 써야 한다. (ImageProcessor.get_frame 은 Frame 을 만들 때 복사한다)
+
+    영상 파일은 개발용이므로 스레드 없이 읽을 때마다 다음 프레임을 하나씩 가져온다. (FileVideoStream 처럼 순서대로)
+    """
+
+    def __init__(self, src=0, size: int = None, name="FrameRingBuffer"):
+        self.is_file = isinstance(src, str)
+        self.stream = cv2.VideoCapture(src)
+        self.size = size or const.CAPTURE_BUFFER_SIZE
+        self.name = name
+        self._slots = None
+        self._timestamps = [0.0] * self.size
+        self._qualities = [0.0] * self.size
+        self._seq = 0
+        self._condition = Condition()
+        self.stopped = False
+        if not self.is_file:
+            # WebcamVideoStream 처럼 첫 프레임은 만들면서 읽어둔다
+            self._capture()
+
+    def start(self):
+        if not self.is_file:
+            t = Thread(target=self.update, name=self.name, args=())
+            t.daemon = True
+            t.start()
+        return self
+
+    def _capture(self) -> bool:
+        """다음 슬롯에 한 프레임을 읽어 넣는다. 실패하면 False"""
+        i = (self._seq + 1) % self.size
+        slot = self._slots[i] if self._slots is not None else None
+        grabbed, image = self.stream.read(image=slot)
+        if not grabbed:
+            return False
+        timestamp = time.monotonic()
+        if self._slots is None:
+            # 해상도는 첫 프레임을 보고 정한다
+            self._slots = [np.empty_like(image) for _ in range(self.size)]
+            slot = self._slots[i]
+        if image is not slot:
+            # 백엔드가 버퍼를 새로 할당한 경우 (해상도가 바뀌었을 때 등)
+            if image.shape != slot.shape:
+                self._slots[i] = slot = np.empty_like(image)
+            np.copyto(slot, image)
+        # 선명도는 캡처할 때 한 번만 계산해서 같이 넣어둔다
+        quality = get_quality(slot)
+        with self._condition:
+            self._timestamps[i] = timestamp
+            self._qualities[i] = quality
+            self._seq += 1
+            self._condition.notify_all()
+        return True
+
+    def update(self):
+        while not self.stopped:
+            if not self._capture():
+                time.sleep(0.005)
+
+    def _get(self, seq: int) -> CapturedFrame:
+        i = seq % self.size
+        return CapturedFrame(seq, self._timestamps[i], self._slots[i], self._qualities[i])
+
+    @property
+    def seq(self) -> int:
+        """가장 최근에 캡처한 프레임의 번호 (아직 없으면 0)"""
+        return self._seq
+
+    def latest(self) -> CapturedFrame:
+        """가장 최근 프레임. 영상 파일이면 다음 프레임을 읽는다. 프레임이 없으면 None"""
+        if self.is_file and not self._capture():
+            return None
+        with self._condition:
+            if self._seq == 0:
+                return None
+            return self._get(self._seq)
+
+    def next_after(self, seq: int, timeout: float = None) -> CapturedFrame:
+        """seq 보다 새로운 프레임 중 가장 최근 것. 아직 없으면 timeout 초까지 기다리고, 그래도 없으면 None"""
+        if self.is_file:
+            while self._seq <= seq:
+                if not self._capture():
+                    return None
+            return self._get(self._seq)
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > seq or self.stopped, timeout=timeout):
+                return None
+            return self._get(self._seq) if self._seq > seq else None
+
+    def last(self, k: int) -> list:
+        """최근 k 개 프레임 (오래된 것부터). 슬롯 수보다 많이 요청할 수 없다"""
+        k = min(k, self.size - 1)
+        with self._condition:
+            first = max(self._seq - k + 1, 1)
+            return [self._get(seq) for seq in range(first, self._seq + 1)]
+
+    def read(self):
+        """WebcamVideoStream.read() 와 같은 용도: 최근 프레임 이미지"""
+        captured = self.latest()
+        return None if captured is None else captured.image
+
+    def stop(self):
+        self.stopped = True
+        with self._condition:
+            self._condition.notify_all()
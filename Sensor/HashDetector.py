@@ -1,24 +1,128 @@
 import cv2
 import os
+import hashlib
 import numpy as np
 import glob
+from Constant import const
+
+# 0~255 각 바이트에 켜진 비트 수
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# 템플릿 증강: 회전 각도, 확대 비율, 원근 기울기 (한쪽 변을 줄이는 비율)
+AUGMENT_ANGLES = (-12, -6, 0, 6, 12)
+AUGMENT_SCALES = (0.9, 1.0, 1.1)
+AUGMENT_TILTS = ((0, 0), (0.08, 0), (-0.08, 0), (0, 0.08), (0, -0.08))
+
+
+class HashIndex:
+    """해시 행렬과 각 행의 라벨 번호를 들고 있는 최근접 이웃 인덱스.
+    중복되는 해시는 한 행으로 합쳐두고, 질의할 때는 XOR + popcount 로 전체 행과의 거리를 한 번에 구한다.
+    """
+
+    def __init__(self, hashes: np.ndarray, label_ids: np.ndarray):
+        # 라벨이 다른데 해시가 같은 경우는 거의 없으므로 (해시, 라벨) 단위로 중복 제거
+        rows = np.concatenate([hashes, label_ids[:, None].astype(np.uint8)], axis=1)
+        rows = np.unique(rows, axis=0)
+        self.hashes = np.ascontiguousarray(rows[:, :-1])
+        self.label_ids = rows[:, -1].astype(np.intp)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def query(self, src_hash: np.ndarray) -> tuple:
+        """return: (가장 가까운 행의 라벨 번호, 거리)"""
+        distances = POPCOUNT[np.bitwise_xor(self.hashes, src_hash)].sum(axis=1)
+        best = int(np.argmin(distances))
+        return int(self.label_ids[best]), distances[best] / (src_hash.size * 8)
 
 class HashDetector:
 
-    dim = (512, 512)
+    dim = const.HASH_DIM
 
-    def __init__(self, file_path) -> None:
-        self.directions_hash = []
-        self.directions = []
+    def __init__(self, file_path, dim: tuple = None, augment: bool = False) -> None:
+        """
+        :param augment: True 면 템플릿마다 조금씩 회전, 확대/축소, 기울인 해시를 같이 만들어 인덱스에 넣는다.
+        """
+        self.dim = tuple(dim) if dim else HashDetector.dim
+        self.augment = augment
         self.check_file_type(file_path)
-        self.file_lst = os.listdir(file_path)
+        self.file_lst = sorted(os.listdir(file_path))
         if '.DS_Store' in self.file_lst:
             self.file_lst.remove('.DS_Store')
-        for direction in self.file_lst:
-            self.directions_hash.append(self.image_to_hash(cv2.imread(file_path + direction)))
-            self.directions.append(direction.rsplit('.')[0])
-        print(file_path + direction)
-        print(self.directions)
+        # directions_hash: 템플릿 해시를 한 행씩 쌓은 (해시 수, 해시 바이트) 행렬, hash_labels: 각 행의 directions 번호
+        self.directions_hash, self.hash_labels, self.directions = self.load_template_pack(file_path)
+        self.index = HashIndex(self.directions_hash, self.hash_labels)
+        print(self.directions, len(self.index))
+
+    def get_pack_path(self, file_path: str) -> str:
+        augment = "_aug" if self.augment else ""
+        return f"{file_path.rstrip('/')}_{self.dim[0]}x{self.dim[1]}{augment}.npz"
+
+    def get_checksum(self, file_path: str) -> str:
+        augment = (AUGMENT_ANGLES, AUGMENT_SCALES, AUGMENT_TILTS) if self.augment else None
+        md5 = hashlib.md5(repr((self.dim, augment)).encode())
+        for file_name in self.file_lst:
+            md5.update(file_name.encode())
+            with open(file_path + file_name, 'rb') as f:
+                md5.update(f.read())
+        return md5.hexdigest()
+
+    def load_template_pack(self, file_path: str) -> tuple:
+        """템플릿 해시를 미리 계산해둔 .npz 팩에서 읽어온다.
+        팩이 없거나 템플릿 이미지가 바뀌었으면(checksum 불일치) 이미지를 다시 해시해서 팩을 새로 만든다.
+        """
+        pack_path = self.get_pack_path(file_path)
+        checksum = self.get_checksum(file_path)
+        if os.path.exists(pack_path):
+            try:
+                pack = np.load(pack_path)
+                if str(pack["checksum"]) == checksum:
+                    return pack["hashes"], pack["hash_labels"], [str(label) for label in pack["labels"]]
+            except (OSError, KeyError, ValueError):
+                pass
+
+        hashes = []
+        hash_labels = []
+        for i, file_name in enumerate(self.file_lst):
+            src = cv2.imread(file_path + file_name)
+            templates = self.augment_template(src, size=4 * max(self.dim)) if self.augment else [src]
+            hashes.extend(self.image_to_hash(template, dim=self.dim) for template in templates)
+            hash_labels.extend([i] * len(templates))
+        hashes = np.stack(hashes)
+        hash_labels = np.array(hash_labels, dtype=np.intp)
+        labels = [file_name.rsplit('.')[0] for file_name in self.file_lst]
+        try:
+            np.savez(pack_path, hashes=hashes, hash_labels=hash_labels, labels=np.array(labels), checksum=checksum)
+        except OSError:
+            print("템플릿 팩을 저장하지 못했습니다:", pack_path)
+        return hashes, hash_labels, labels
+
+    @staticmethod
+    def augment_template(src: np.ndarray, size: int = None) -> list:
+        """템플릿을 조금씩 기울이고(원근), 회전하고, 확대/축소한 이미지들. 빈 곳은 배경색(흰색)으로 채운다.
+        :param size: 긴 변을 이 크기로 먼저 줄인다. 해시 해상도의 4배 정도로 줄여두면 변환 결과는 같고 훨씬 빠르다
+        """
+        if len(src.shape) == 3:
+            src = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+        h, w = src.shape[:2]
+        ratio = size / max(h, w) if size else 1
+        if ratio < 1:
+            src = cv2.resize(src, dsize=None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+        h, w = src.shape[:2]
+        corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+        templates = []
+        for tilt_x, tilt_y in AUGMENT_TILTS:
+            # tilt_x > 0: 윗변이 좁아짐(고개를 숙여서 본 것처럼), tilt_y > 0: 오른쪽 변이 좁아짐
+            dx, dy = w * tilt_x, h * tilt_y
+            pts = np.float32([[max(dx, 0), max(-dy, 0)], [w - max(dx, 0), max(dy, 0)],
+                              [w - max(-dx, 0), h - max(dy, 0)], [max(-dx, 0), h - max(-dy, 0)]])
+            M = cv2.getPerspectiveTransform(corners, pts)
+            tilted = cv2.warpPerspective(src, M, (w, h), borderValue=255)
+            for angle in AUGMENT_ANGLES:
+                for scale in AUGMENT_SCALES:
+                    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, scale)
+                    templates.append(cv2.warpAffine(tilted, M, (w, h), borderValue=255))
+        return templates
 
     @staticmethod
     def image_resize_with_pad(src, size, padColor=255):
@@ -67,27 +171,31 @@ class HashDetector:
         return scaled_img
          
     @staticmethod
-    def image_to_hash(img : np.ndarray, is_arrow : bool = False) -> list:
-        
+    def image_to_hash(img : np.ndarray, is_arrow : bool = False, dim : tuple = None) -> np.ndarray:
+        """평균 해시를 np.packbits 로 압축한 uint8 배열 (dim[0]*dim[1]/8 바이트)"""
+        dim = dim or HashDetector.dim
         if len(img.shape) == 3:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        if is_arrow:
-            img = cv2.resize(src=img, dsize=HashDetector.dim)
-        else:  
-            img = cv2.resize(src=img, dsize=HashDetector.dim)
+        # 축소할 때는 INTER_AREA 를 써야 작은 해상도에서도 앨리어싱 없이 평균이 유지된다
+        h, w = img.shape[:2]
+        interp = cv2.INTER_AREA if h > dim[1] or w > dim[0] else cv2.INTER_LINEAR
+        img = cv2.resize(src=img, dsize=dim, interpolation=interp)
             
         avg = img.mean()
-        bin = 1 * (img > avg)
-        return bin
+        return np.packbits(img > avg)
     
     @staticmethod
-    def hamming_distance(src_hash : list, cmp_hash : list, threshold : float = 0.1) -> int:
-        src_hash = src_hash.reshape(1,-1)
-        cmp_hash = cmp_hash.reshape(1,-1)
-        # 같은 자리의 값이 서로 다른 것들의 합
-        distance = (src_hash != cmp_hash).sum()
-        return distance / (HashDetector.dim[0]*HashDetector.dim[1])
+    def hamming_distance(src_hash : np.ndarray, cmp_hash : np.ndarray, threshold : float = 0.1) -> float:
+        # XOR 로 서로 다른 비트만 남긴 뒤 popcount 로 개수를 센다
+        distance = int(POPCOUNT[np.bitwise_xor(src_hash, cmp_hash)].sum())
+        return distance / (src_hash.size * 8)
+
+    @staticmethod
+    def hamming_distances(src_hash : np.ndarray, hashes : np.ndarray) -> np.ndarray:
+        """src_hash 와 hashes 의 모든 행 사이의 거리를 한 번에 계산한다."""
+        distances = POPCOUNT[np.bitwise_xor(hashes, src_hash)].sum(axis=1)
+        return distances / (src_hash.size * 8)
     
     @staticmethod
     def check_file_type(image_folder_path, allowed_extensions=None):
@@ -105,38 +213,22 @@ class HashDetector:
         return extension_type
 
     def detect_alphabet_hash(self, img : np.ndarray, threshold=0.3) -> str:
-        img_hash = self.image_to_hash(img)
-        #print(img_hash)
-        hdist_dict = {}
-        
-        for i in range(len(self.directions)):
-            direction = self.directions[i]
-            hash = self.directions_hash[i]
-            hdist_dict[direction] = self.hamming_distance(img_hash, hash)
-        
-        result = min(hdist_dict.keys(), key=(lambda k:hdist_dict[k]))
-        #print()
-        #print(self.directions_hash[1])
-        if hdist_dict[result] > threshold:
+        img_hash = self.image_to_hash(img, dim=self.dim)
+        label, distance = self.index.query(img_hash)
+        if distance > threshold:
             return None, None
-        
-        #print(hdist_dict)
-        return result, hdist_dict[result]
 
-    def detect_arrow(self, img : np.ndarray, thresh=0.6):
-        img_hash = self.image_to_hash(img, is_arrow=True)
+        return self.directions[label], float(distance)
 
-        distance_1 = self.hamming_distance(img_hash, self.directions_hash[0])
-        distance_2 = self.hamming_distance(img_hash, self.directions_hash[1])
+    def detect_arrow(self, img : np.ndarray, thresh=0.6):
+        img_hash = self.image_to_hash(img, is_arrow=True, dim=self.dim)
+        label, distance = self.index.query(img_hash)
 
-        #print(distance_1, distance_2)
-        if distance_2 > thresh and distance_1 > thresh:
+        if distance > thresh:
             return None
 
-        if distance_1 < distance_2:
-            return "LEFT"
-        else:
-            return "RIGHT"
+        # arrow_left -> LEFT, arrow_right -> RIGHT
+        return self.directions[label].rsplit('_', 1)[-1].upper()
 
 
 
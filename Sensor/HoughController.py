@@ -0,0 +1,80 @@
+import numpy as np
+from Constant import const
+
+
+class HoughController:
+    """HoughLinesP 의 투표 수(threshold)와 최소 선분 길이(minLineLength)를 프레임마다 조절해서 선분 수를 목표 범위 안에 둔다.
+    빛 반사나 무늬 있는 바닥에서는 선분이 수백 개 나오고, 그 뒤의 분류 / 맞춤 계산도 선분 수만큼 늘어난다.
+    이번 프레임의 선분 수가 범위보다 많으면 다음 프레임에서 두 값을 step 배 올리고, 적으면 다시 내린다.
+    gain 은 원래 값(기준 해상도에서 정한 값)에 곱하는 배율이고 1 보다 작아지지 않으므로 선분이 적은 평소 장면의 결과는 그대로다.
+    """
+
+    # (이름, 영역 크기): controller
+    controllers = {}
+
+    @classmethod
+    def of(cls, name: str, shape: tuple, band: tuple = None):
+        """이름(yellow, green, corner)과 영역 크기마다 따로 둔 controller. 프레임이 바뀌어도 gain 이 이어진다.
+        잘라낸 영역(ROI)은 같은 장면이라도 선분 수가 화면 전체와 다르므로 영역 크기별로 gain 을 따로 조절한다
+        """
+        key = (name, tuple(shape[:2]))
+        if key not in cls.controllers:
+            cls.controllers[key] = cls(band=band)
+        return cls.controllers[key]
+
+    def __init__(self, band: tuple = None, step: float = None, max_gain: float = None, max_segments: int = None):
+        """
+        :param band: (최소, 최대) 목표 선분 수
+        :param max_segments: gain 이 따라오기 전 프레임이라도 이보다 많은 선분은 긴 것만 남긴다. 없으면 목표 최대의 2배
+        """
+        self.band = const.HOUGH_SEGMENT_BAND if band is None else band
+        self.step = const.HOUGH_GAIN_STEP if step is None else step
+        self.max_gain = const.HOUGH_MAX_GAIN if max_gain is None else max_gain
+        self.max_segments = 2 * self.band[1] if max_segments is None else max_segments
+        self.adaptive = const.HOUGH_ADAPTIVE
+        self.reset()
+
+    def reset(self):
+        self.gain = 1.0
+        # 마지막으로 본 (자르기 전) 선분 수
+        self.count = 0
+
+    def get_params(self, threshold: float, min_length: float, scale: float = 1.0) -> tuple:
+        """:return: 지금 gain 을 곱한 (투표 수, 최소 선분 길이). 기준 해상도 값에 처리 해상도 배율(scale)도 곱한다"""
+        gain = self.gain if self.adaptive else 1.0
+        return round(threshold * scale * gain), round(min_length * scale * gain)
+
+    def update(self, segments: np.ndarray, adapt: bool = True) -> np.ndarray:
+        """이번 프레임의 선분 수로 다음 프레임의 gain 을 정하고, 선분이 max_segments 보다 많으면 긴 것만 남긴다.
+        :param segments: HoughLinesP 결과 (N, 1, 4) 또는 None
+        :param adapt: False 면 gain 은 그대로 두고 자르기만 한다 (LineTracker 의 예측 영역처럼 매번 크기가 바뀌는 경우)
+        """
+        count = 0 if segments is None else len(segments)
+        if adapt:
+            self.count = count
+            low, high = self.band
+            if self.adaptive and count > high:
+                self.gain = min(self.gain * self.step, self.max_gain)
+            elif self.adaptive and count < low:
+                self.gain = max(self.gain / self.step, 1.0)
+        if self.adaptive and count > self.max_segments:
+            d = segments[:, 0, 2:].astype(np.int64) - segments[:, 0, :2]
+            length = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+            segments = segments[np.sort(np.argpartition(-length, self.max_segments)[:self.max_segments])]
+        return segments
+
+
+if __name__ == "__main__":
+    import cv2
+    # 잡음 edge 가 점점 늘어날 때 gain 과 선분 수
+    controller = HoughController()
+    rng = np.random.default_rng(0)
+    for noise in [0, 2000, 8000, 20000, 20000, 20000, 20000, 0, 0, 0, 0]:
+        edges = np.zeros((480, 640), dtype=np.uint8)
+        cv2.line(edges, (320, 0), (320, 479), 255)
+        edges[rng.integers(0, 480, noise), rng.integers(0, 640, noise)] = 255
+        threshold, min_length = controller.get_params(30, 50)
+        segments = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold, np.array([]), minLineLength=min_length, maxLineGap=150)
+        segments = controller.update(segments)
+        print(f"noise {noise:6d} threshold {threshold:3d} min_length {min_length:3d} count {controller.count:4d} "
+              f"kept {0 if segments is None else len(segments):4d} -> gain {controller.gain:.2f}")
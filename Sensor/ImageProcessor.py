@@ -3,81 +3,303 @@ import numpy as np
 import time
 import platform
 import os
+import functools
 
-from imutils.video import WebcamVideoStream
-from imutils.video import FileVideoStream
 from imutils.video import FPS
 from imutils import auto_canny, grab_contours
 
 if __name__ == "__main__":
     from HashDetector import HashDetector
-    from Target import Target, setLabel
+    from ShapeDetector import ShapeDetector
+    from ArrowDetector import ArrowDetector
+    from Target import Target, TargetSet, setLabel
     from LineDetector import LineDetector
     from ColorPreProcessor import ColorPreProcessor
     from CornerFinder import CornerFinder
+    from Frame import Frame
+    from FrameBuffer import FrameRingBuffer
+    from LineTracker import LineTracker
+    from HoughController import HoughController
+    from LineInfo import LineInfo
+    from ResultCache import ResultCache
     from Constant import const, AreaColor
 
 else:
     from Sensor.HashDetector import HashDetector
-    from Sensor.Target import Target, setLabel
+    from Sensor.ShapeDetector import ShapeDetector
+    from Sensor.ArrowDetector import ArrowDetector
+    from Sensor.Target import Target, TargetSet, setLabel
     from Sensor.LineDetector import LineDetector
     from Sensor.ColorPreProcessor import ColorPreProcessor
     from Sensor.CornerFinder import CornerFinder
+    from Sensor.Frame import Frame
+    from Sensor.FrameBuffer import FrameRingBuffer
+    from Sensor.LineTracker import LineTracker
+    from Sensor.HoughController import HoughController
+    from Sensor.LineInfo import LineInfo
+    from Sensor.ResultCache import ResultCache
     from Constant import WalkInfo, LineColor, const
 
+def scene_cached(min_quality: float = None):
+    """장면이 그대로이고 그 사이 Motion 명령이 없었으면 검출을 다시 하지 않고 이전 결과를 돌려주는 데코레이터.
+    검출할 프레임을 먼저 받아서 서명을 비교하고, 검출하는 동안에는 그 프레임을 고정해서 get_frame 이 같은 프레임을 주게 한다.
+    시각화 인자가 켜져 있으면 캐시를 쓰지 않는다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def decorated(self, *args, **kwargs):
+            if any(value is True for key, value in kwargs.items() if "visualization" in key):
+                return func(self, *args, **kwargs)
+            frame = self.get_frame(min_quality=min_quality)
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            version = self.get_motion_version()
+            hit, result = self._result_cache.get(key, frame.signature, version)
+            if hit:
+                return result
+            # 틱 단위로 고정된 프레임이 있으면 검출이 끝난 뒤 되돌려 놓는다
+            pinned = self._pinned_frame, self._pinned_version
+            self._pinned_frame, self._pinned_version = frame, version
+            try:
+                result = func(self, *args, **kwargs)
+            finally:
+                self._pinned_frame, self._pinned_version = pinned
+            self._result_cache.put(key, frame.signature, result, version)
+            return result
+        return decorated
+    return decorator
+
+
 class ImageProcessor:
 
 
-    def __init__(self, video_path : str = ""):
+    def __init__(self, video_path : str = "", size: tuple = None):
+        """
+        :param size: 영상 처리 해상도 (w, h), 없으면 const.PROCESSING_SIZE. 카메라 해상도와 다르면 프레임을 줄여서 처리한다
+        """
         if video_path and os.path.exists(video_path):
-            self._cam = FileVideoStream(path=video_path).start()
+            self._cam = FrameRingBuffer(src=video_path).start()
         else:
             if platform.system() == "Linux":
-                self._cam = WebcamVideoStream(src=-1).start()
+                self._cam = FrameRingBuffer(src=-1).start()
             else:
-                self._cam = WebcamVideoStream(src=0).start()
+                self._cam = FrameRingBuffer(src=0).start()
         # 개발때 알고리즘 fps 체크하기 위한 모듈. 실전에서는 필요없음
         self.fps = FPS()
         if __name__ == "__main__":
-            self.hash_detector4door = HashDetector(file_path='EWSN/')
-            self.hash_detector4room = HashDetector(file_path='ABCD/')
+            self.hash_detector4door = HashDetector(file_path='EWSN/', augment=True)
+            self.hash_detector4room = HashDetector(file_path='ABCD/', augment=True)
             self.hash_detector4arrow = HashDetector(file_path='src/arrow/')
+            # ShapeDetector 는 증강 템플릿을 만드느라 느리므로 알파벳 엔진이 "SHAPE" 일 때 처음 쓸 때 만든다
+            self._shape_paths = {"door": 'EWSN/', "room": 'ABCD/'}
 
         else:
 
-            self.hash_detector4door = HashDetector(file_path='Sensor/EWSN/')
-            self.hash_detector4room = HashDetector(file_path='Sensor/ABCD/')
+            self.hash_detector4door = HashDetector(file_path='Sensor/EWSN/', augment=True)
+            self.hash_detector4room = HashDetector(file_path='Sensor/ABCD/', augment=True)
             self.hash_detector4arrow = HashDetector(file_path='Sensor/src/arrow/')
+            # ShapeDetector 는 증강 템플릿을 만드느라 느리므로 알파벳 엔진이 "SHAPE" 일 때 처음 쓸 때 만든다
+            self._shape_paths = {"door": 'Sensor/EWSN/', "room": 'Sensor/ABCD/'}
 
+        self._shape_detectors = {}
         self.line_detector = LineDetector()
-
-        shape = (self.height, self.width, _) = self.get_image().shape
-        print(shape)  # 이미지 세로, 가로 (행, 열) 정보 출력
+        self._frame = None
+        self._captured = None
+        self._motion = None
+        self._pinned_frame = None
+        self._pinned_version = None
+        self._result_cache = ResultCache()
+        # (ROI, ROI_edge): LineTracker, 보는 영역마다 좌표가 다르므로 따로 추적한다
+        self.line_tracking = const.LINE_TRACKING
+        self.line_trackers = {}
+
+        self.width, self.height = size or const.PROCESSING_SIZE
+        # 기준 해상도(640x480)에서 정한 픽셀 단위 값에 곱하는 배율
+        self.scale = self.width / const.REFERENCE_SIZE[0]
+        self._frame_image = None
+        shape = self.get_image().shape
+        print(shape, "->", (self.height, self.width))  # 카메라 이미지 세로, 가로 (행, 열) 와 처리 해상도 출력
+        ColorPreProcessor.allocate_workspace((self.height, self.width))
         time.sleep(2)
 
-    def get_image(self, visualization=False):
-        src = self._cam.read()
-        if src is None:
+    def get_shape_detector(self, name: str) -> ShapeDetector:
+        """name: "door" 또는 "room". 처음 부를 때 증강 템플릿으로 ShapeDetector 를 만든다"""
+        if name not in self._shape_detectors:
+            self._shape_detectors[name] = ShapeDetector(file_path=self._shape_paths[name], augment=True)
+        return self._shape_detectors[name]
+
+    @property
+    def shape_detector4door(self) -> ShapeDetector:
+        return self.get_shape_detector("door")
+
+    @property
+    def shape_detector4room(self) -> ShapeDetector:
+        return self.get_shape_detector("room")
+
+    def bind_motion(self, motion):
+        """Motion 을 연결하면 get_image 는 마지막 동작의 ACK 이후 const.MOTION_SETTLE_TIME 이 지나서 찍힌 프레임만 돌려준다."""
+        self._motion = motion
+
+    def wait_for_fresh_frame(self, settle: float = None, timeout: float = None):
+        """마지막 동작 명령의 ACK + settle 초 이후에 캡처된 프레임이 들어올 때까지 기다린다.
+        :return: CapturedFrame, ACK 나 프레임을 timeout 안에 못 받으면 최근 프레임
+        """
+        settle = const.MOTION_SETTLE_TIME if settle is None else settle
+        timeout = const.MOTION_ACK_TIMEOUT if timeout is None else timeout
+        ack_time = self._motion.wait_ack(timeout=timeout)
+        if ack_time is None:
+            return self._cam.latest()
+        fresh_after = ack_time + settle
+        delay = fresh_after - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        captured = self._cam.latest()
+        while captured is not None and captured.timestamp < fresh_after:
+            newer = self._cam.next_after(captured.seq, timeout=timeout)
+            if newer is None:
+                break
+            captured = newer
+        return captured
+
+    @staticmethod
+    def get_thumbnail(src: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, dsize=const.SETTLE_SIZE, interpolation=cv2.INTER_AREA)
+
+    def wait_until_settled(self, timeout: float = None) -> bool:
+        """머리를 돌린 뒤처럼 화면이 흔들릴 때, 연속 프레임을 축소해서 비교하다가 화면이 멈추면 바로 돌아온다.
+        :return: 동작 ACK 뒤 첫 프레임부터 timeout 초 안에 멈췄으면 True
+        """
+        timeout = const.SETTLE_TIMEOUT if timeout is None else timeout
+        captured = self.wait_for_fresh_frame(settle=0) if self._motion is not None else self._cam.latest()
+        if captured is None:
+            return False
+        # ACK 를 기다리는 시간(최대 MOTION_ACK_TIMEOUT)은 빼고, 움직인 뒤의 프레임이 들어온 때부터 잰다
+        deadline = time.monotonic() + timeout
+        prev = self.get_thumbnail(captured.image)
+        still = 0
+        while time.monotonic() < deadline:
+            captured = self._cam.next_after(captured.seq, timeout=max(deadline - time.monotonic(), 0))
+            if captured is None:
+                break
+            curr = self.get_thumbnail(captured.image)
+            diff = cv2.norm(prev, curr, cv2.NORM_L1) / curr.size
+            still = still + 1 if diff < const.SETTLE_DIFF_THRESH else 0
+            if still >= const.SETTLE_FRAMES:
+                return True
+            prev = curr
+        return False
+
+    def get_sharp_frame(self, captured, min_quality: float):
+        """captured 가 최근 프레임들 중 가장 선명한 것의 min_quality 배보다 흐리면(걷는 중에 찍혀 번진 프레임)
+        다음 프레임을 최대 const.QUALITY_WAIT_FRAMES 장, const.QUALITY_WAIT_TIMEOUT 초까지 기다린다. 끝내 못 찾으면 그중 가장 선명한 프레임
+        """
+        recent = self._cam.last(const.QUALITY_WINDOW)
+        peak = max([frame.quality for frame in recent] + [captured.quality])
+        best = captured
+        # 카메라가 멈추거나 느려도 한 틱이 오래 막히지 않도록 전체 대기 시간을 한 번에 제한한다
+        deadline = time.monotonic() + const.QUALITY_WAIT_TIMEOUT
+        for _ in range(const.QUALITY_WAIT_FRAMES):
+            if captured.quality >= min_quality * peak:
+                return captured
+            captured = self._cam.next_after(captured.seq, timeout=max(deadline - time.monotonic(), 0))
+            if captured is None:
+                break
+            if captured.quality > best.quality:
+                best = captured
+        return best
+
+    def get_image(self, visualization=False, min_quality: float = None):
+        """
+        :param min_quality: 주면 흔들려서 번진 프레임 대신 선명한 프레임을 잠깐 기다린다 (get_sharp_frame)
+        """
+        captured = self.wait_for_fresh_frame() if self._motion is not None else self._cam.latest()
+        if captured is None:
             exit()
+        if min_quality:
+            captured = self.get_sharp_frame(captured, min_quality)
+        self._captured = captured
+        src = captured.image
         if visualization:
             cv2.imshow("src", src)
             cv2.waitKey(1)
         return src
 
+    def get_motion_version(self):
+        """연결된 Motion 이 지금까지 보낸 명령 수. 고정해둔 프레임이나 검출 결과가 아직 유효한지 판단하는 데 쓴다."""
+        return self._motion.command_count if self._motion is not None else None
 
+    def hold_frame(self, min_quality: float = None) -> Frame:
+        """Controller 한 틱 동안 모든 검출이 같은 프레임(과 그 Frame 캐시)을 쓰도록 새 프레임 하나를 고정한다.
+        틱 도중에 Motion 명령을 보냈으면 다음 get_frame 에서 새 프레임을 받아 다시 고정한다.
+        고정하는 Frame 은 get_frame 이 링 버퍼 슬롯을 복사해서 만든 것이므로, 틱이 링 한 바퀴보다 길어져도
+        캡처 스레드가 덮어쓰지 않는다. (Frame 을 get_frame 밖에서 슬롯으로 직접 만들어 고정하면 안 된다)
+        """
+        self.release_frame()
+        self._pinned_frame = self.get_frame(min_quality=min_quality)
+        self._pinned_version = self.get_motion_version()
+        return self._pinned_frame
+
+    def release_frame(self):
+        self._pinned_frame = None
+        self._pinned_version = None
+
+    def get_frame(self, visualization=False, min_quality: float = None) -> Frame:
+        if self._pinned_frame is not None:
+            if self._pinned_version == self.get_motion_version():
+                return self._pinned_frame
+            # 고정한 뒤에 로봇이 움직였으므로 움직인 뒤의 프레임으로 바꿔 고정한다
+            self._pinned_frame = None
+            return self.hold_frame(min_quality=min_quality)
+        src = self.get_image(visualization=visualization, min_quality=min_quality)
+        # 새 프레임이 들어오기 전까지는 같은 캡처 번호가 나오므로 같은 프레임이면 Frame 을 재사용한다
+        captured = self._captured
+        if self._frame is None or self._frame.seq != captured.seq or self._frame_image is not src:
+            self._frame_image = src
+            if src.shape[:2] != (self.height, self.width):
+                src = cv2.resize(src, dsize=(self.width, self.height), interpolation=cv2.INTER_AREA)
+            else:
+                # src 는 링 버퍼 슬롯이라 0.3초쯤 뒤면 캡처 스레드가 새 프레임으로 덮어쓴다.
+                # Frame 은 그보다 오래 (틱 내내) 쓰이고 파생 이미지를 나중에 계산하므로 복사본을 갖게 한다.
+                # 이전 Frame 을 scene_cached 가 아직 쥐고 있을 수 있어서 버퍼 하나를 돌려쓰지 않고 Frame 마다 새로 복사한다
+                src = src.copy()
+            self._frame = Frame(src, seq=captured.seq, timestamp=captured.timestamp, scale=self.scale)
+        return self._frame
+
+    def to_pixels(self, pos: tuple) -> tuple:
+        """화면 크기 대비 비율 좌표 (x, y) 를 처리 해상도의 픽셀 좌표로 바꾼다."""
+        return round(pos[0] * self.width), round(pos[1] * self.height)
 
 
     def get_door_alphabet_using_iou(self, visualization: bool = False) -> str:
-        src = self.get_image()
+        roi_mask = self.get_door_alphabet_roi(visualization=visualization)
+        if roi_mask is None:
+            return None
+        if const.DOOR_ALPHABET_ENGINE == "SHAPE":
+            answer, _ = self.shape_detector4door.detect_alphabet(roi_mask, threshold=const.SHAPE_THRESH4DOOR)
+        else:
+            answer, _ = self.hash_detector4door.detect_alphabet_hash(roi_mask, threshold=0.6)
+        return answer
+
+    @staticmethod
+    def get_quadrilateral_candidates(contours: list, scale: float = 1.0) -> TargetSet:
+        """문 알파벳 후보: 넓이 3000 초과 (기준 해상도에서, scale 은 처리 해상도 배율), 종횡비 1.5 이하, 꼭짓점 4개로 근사되는 contour.
+        넓이와 종횡비는 전체 contour 에 대해 한 번에 거르고, approxPolyDP 는 살아남은 것에만 한다.
+        """
+        candidates = TargetSet.from_contours(contours).filter(min_area=3000 * scale ** 2, max_aspect_ratio=1.5)
+        return candidates.select_polygons(contours, vertices=4)
+
+    def get_door_alphabet_roi(self, visualization: bool = False):
+        """
+
+        :return: 문 알파벳 영역의 이진화 mask (글자가 검은색), 후보가 없으면 None
+        """
+        frame = self.get_frame()
+        src = frame.src
         if visualization:
             canvas = src.copy()
             roi_canvas = canvas.copy()
-        no_canny_targets = []
-        canny_targets = []
         # 그레이스케일화
-        hls = cv2.cvtColor(src, cv2.COLOR_BGR2HLS)
-        h, l, s =cv2.split(hls)
-        #gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+        l = frame.l
         # ostu이진화, 어두운 부분이 true(255) 가 되도록 THRESH_BINARY_INV
         _, mask = cv2.threshold(l, 60, 255, cv2.THRESH_BINARY_INV)
         cv2.imshow("mask",mask)
@@ -87,42 +309,15 @@ class ImageProcessor:
         cnts1, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         cnts2, _ = cv2.findContours(canny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        for cnt in cnts1:
-
-            (_, _, width, height) = cv2.boundingRect(cnt)
-            area = cv2.contourArea(cnt)
-            approx = cv2.approxPolyDP(cnt, cv2.arcLength(cnt, True) * 0.02, True)
-            vertice = len(approx)
-            # roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 roi만 통과
-            area_ratio = width / height if height < width else height / width
-            area_ratio = round(area_ratio, 2)
-
-            if not ( 3000 < area and area_ratio <= 1.5 and vertice == 4):
-                continue
-
-            target = Target(contour=cnt)
-            no_canny_targets.append(target)
-            if visualization:
-                setLabel(canvas, cnt, "no_canny")
-
-        for cnt in cnts2:
-            (_, _, width, height) = cv2.boundingRect(cnt)
-            area = cv2.contourArea(cnt)
-            approx = cv2.approxPolyDP(cnt, cv2.arcLength(cnt, True) * 0.02, True)
-            vertice = len(approx)
-            # roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 roi만 통과
-            area_ratio = width / height if height < width else height / width
-            area_ratio = round(area_ratio, 2)
-
-            if not (3000 < area and area_ratio <= 1.5 and vertice == 4):
-                continue
-            target = Target(contour=cnt)
-            canny_targets.append(target)
-            if visualization:
-                setLabel(canvas, cnt, "canny", color=(0,0,255))
-
+        no_canny_targets = self.get_quadrilateral_candidates(cnts1, self.scale)
+        canny_targets = self.get_quadrilateral_candidates(cnts2, self.scale)
+        if visualization:
+            for target in no_canny_targets.get_targets():
+                setLabel(canvas, target.get_pts(), "no_canny")
+            for target in canny_targets.get_targets():
+                setLabel(canvas, target.get_pts(), "canny", color=(0,0,255))
 
-        target = Target.non_maximum_suppression4targets(canny_targets, no_canny_targets, threshold=0.4)
+        target = TargetSet.non_maximum_suppression(canny_targets, no_canny_targets, threshold=0.4)
 
         if visualization:
             cv2.imshow("src", cv2.hconcat([canvas, roi_canvas]))
@@ -133,11 +328,8 @@ class ImageProcessor:
 
         if target is None:
             return None
-        roi = target.get_target_roi(src=src)
-        roi_hls = cv2.cvtColor(roi, cv2.COLOR_BGR2HLS)
-        roi_hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        roi_hsv = target.get_target_roi(src=frame.hsv)
 
-        roi_h, roi_l, roi_s = cv2.split(roi_hls)
         #_, roi_mask = cv2.threshold(roi_l, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         #roi_mask = cv2.inRange(roi_hsv, np.array([0, 0, 0]), np.array([180, 255, const.DOOR_THRESH_VALUE]))
         roi_mask = cv2.inRange(roi_hsv, np.array([0, 0, 0]), np.array([180, 255, 30]))
@@ -146,25 +338,41 @@ class ImageProcessor:
         if visualization:
             pos = target.get_pts()
             setLabel(roi_canvas, target.get_pts(), label="roi", color=(255,0,0))
-            mask = HashDetector.image_resize_with_pad(src=roi_mask, size=HashDetector.dim)
+            mask = HashDetector.image_resize_with_pad(src=roi_mask, size=self.hash_detector4door.dim)
             #roi_canvas[pos[1]:pos[1]+pos[3],pos[0]:pos[0]+pos[2]] = cv2.cvtColor(roi_mask, cv2.COLOR_GRAY2BGR)
             cv2.imshow("src", cv2.hconcat(
                 [canvas, roi_canvas]))
             cv2.imshow('mask', roi_mask)
             cv2.waitKey(1)
 
-        answer, _ = self.hash_detector4door.detect_alphabet_hash(roi_mask, threshold=0.6)
-        return answer
+        return roi_mask
 
     def get_arrow_direction(self, visualization: bool = False):
-        src = self.get_image()
+        roi_mask = self.get_arrow_roi(visualization=visualization)
+        if roi_mask is None:
+            return None
+
+        # 모양으로 추정한 방향이 확실하지 않을 때만 해시 검출기를 쓴다
+        direction, confidence = ArrowDetector.estimate(roi_mask)
+        if confidence < const.ARROW_CONFIDENCE_THRESH:
+            direction = self.hash_detector4arrow.detect_arrow(roi_mask)
+        if visualization:
+            print(direction, round(confidence, 2))
+
+        return direction
+
+    def get_arrow_roi(self, visualization: bool = False):
+        """
+
+        :return: 화살표 영역의 gray 이미지, 화살표가 없으면 None
+        """
+        frame = self.get_frame()
+        src = frame.src
         dst = src.copy()
 
         kernel = np.ones((5, 5), np.uint8)
 
-        gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
-        hls = cv2.cvtColor(src, cv2.COLOR_BGR2HLS)
-        h, l, s = cv2.split(hls)
+        l = frame.l
         _, binary = cv2.threshold(l, const.DIRECTION_THRESH_VALUE , 255, cv2.THRESH_BINARY_INV+cv2.THRESH_OTSU)
         binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
         edge = auto_canny(binary)
@@ -175,7 +383,7 @@ class ImageProcessor:
 
         contour = max(contours, key=lambda x:cv2.contourArea(x))
         
-        if cv2.contourArea(contour) < 2000:
+        if cv2.contourArea(contour) < 2000 * self.scale ** 2:
             return None
         
         leftmost = tuple(contour[contour[:,:,0].argmin()][0])
@@ -184,11 +392,12 @@ class ImageProcessor:
         bottommost = tuple(contour[contour[:,:,1].argmax()][0])
 
         result = [leftmost[0], topmost[1], rightmost[0]-leftmost[0], bottommost[1]-topmost[1]]
-        if result[2] < 10 or result[3] < 10:
-            roi_mask = src
+        # 해시 검출기는 어차피 gray 로 변환하므로 Frame 의 gray 를 잘라서 넘긴다
+        if result[2] < 10 * self.scale or result[3] < 10 * self.scale:
+            roi_mask = frame.gray
         else:
             #print(result)
-            roi_mask = src[result[1] : result[1] + result[3], result[0] : result[0] + result[2]]
+            roi_mask = frame.gray[result[1] : result[1] + result[3], result[0] : result[0] + result[2]]
 
         cv2.drawContours(dst, [contour], -1, (255, 0, 0), 2)
         if visualization:
@@ -198,116 +407,101 @@ class ImageProcessor:
             cv2.imshow("roi_mask", roi_mask)
             cv2.waitKey(10)
 
-        direction = self.hash_detector4arrow.detect_arrow(roi_mask)
-        print(direction)
-
-        return direction
+        return roi_mask
 
     def get_alphabet_info4room(self, visualization=False) -> tuple:
-        src = self.get_image()
-        if visualization:
-            canvas = src.copy()
         alphabet_info = None
-        candidates = []
-        src = cv2.GaussianBlur(src, (5, 5), 0)
-        mask = ColorPreProcessor.get_blue_mask4alphabet(src=src)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for contour in contours:  # enumerate 함수는 순서가 있는 자료형을 받아 인덱스와 데이터를 반환한다.
-
-            (_, _, width, height) = cv2.boundingRect(contour)
-            area = cv2.contourArea(contour)
+        roi_mask = self.get_alphabet_roi4room(visualization=visualization)
+        if roi_mask is not None:
+            if const.ROOM_ALPHABET_ENGINE == "SHAPE":
+                candidate_alphabet, _ = self.shape_detector4room.detect_alphabet(roi_mask, threshold=const.SHAPE_THRESH4ROOM)
+            else:
+                candidate_alphabet, _ = self.hash_detector4room.detect_alphabet_hash(roi_mask, threshold=0.8)
+            if candidate_alphabet and candidate_alphabet in ["B", "D"] :
+                alphabet_info = candidate_alphabet
 
-            # roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 roi만 통과
-            area_ratio = width / height if height < width else height / width
-            area_ratio = round(area_ratio, 2)
-            if not (1000 < area and area_ratio <= 1.5):
-                continue
+        return alphabet_info
 
+    def get_alphabet_roi4room(self, visualization=False):
+        """
 
-            candidate = Target(contour=contour)
-            if visualization:
+        :return: 방 알파벳(파란색) 영역의 mask, 후보가 없으면 None
+        """
+        src = self.get_frame().src
+        if visualization:
+            canvas = src.copy()
+        roi_mask = None
+        src = Frame(cv2.GaussianBlur(src, (5, 5), 0))
+        mask = ColorPreProcessor.get_blue_mask4alphabet(src=src)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 roi만 통과
+        candidates = TargetSet.from_contours(contours).filter(min_area=1000 * self.scale ** 2, max_aspect_ratio=1.5)
+        if visualization:
+            for candidate in candidates.get_targets():
                 setLabel(canvas, candidate.get_pts(), label=f" POS x:{candidate.x}, y:{candidate.y}", color=(255, 255, 255))
-            candidates.append(candidate)
-        if candidates:
-            selected = min(candidates, key=lambda candidate: candidate.get_center_pos()[1])
-            roi_mask = selected.get_target_roi(mask, pad=10)
+        if len(candidates):
+            selected = candidates.get_target(candidates.argmin("center_y"))
+            roi_mask = selected.get_target_roi(mask, pad=round(10 * self.scale))
             if visualization:
                 cv2.imshow("roi_mask", roi_mask)
-            candidate_alphabet, _ = self.hash_detector4room.detect_alphabet_hash(roi_mask, threshold=0.8)
-            if candidate_alphabet and candidate_alphabet in ["B", "D"] :
-                alphabet_info = candidate_alphabet
         if visualization:
             mask = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
             debug = cv2.hconcat([mask, canvas])
             cv2.imshow("debug", debug)
             cv2.waitKey(1)
 
-        return alphabet_info
+        return roi_mask
 
 
 
+    @scene_cached()
     def get_milk_info(self, color:str, visualization=False) -> tuple:
-        src = self.get_image()
+        frame = self.get_frame()
+        src = frame.src
         if visualization:
             canvas = src.copy()
-        candidates = []
         selected = None
 
         ### 색상 이진화를 이용한 마스킹 과정 ###
         if color == "BLUE":
-            color_mask = ColorPreProcessor.get_blue_mask4box(src=src)
+            color_mask = ColorPreProcessor.get_blue_mask4box(src=frame)
         else:
-            color_mask = ColorPreProcessor.get_red_mask4box(src=src)
+            color_mask = ColorPreProcessor.get_red_mask4box(src=frame)
 
         mask = color_mask
         ###############################
         ###############################
 
         ### 라벨링을 이용한 객체 구별 ###############
-        _, y, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        # 중심점이 NaN 인 라벨은 TargetSet 을 만들 때 빠진다
+        targets = TargetSet.from_stats(stats, centroids)
 
-        for idx, centroid in enumerate(centroids):  # enumerate 함수는 순서가 있는 자료형을 받아 인덱스와 데이터를 반환한다.
-            if stats[idx][0] == 0 and stats[idx][1] == 0:
-                continue
+        ### (0, 0) 에서 시작하는 라벨(배경)은 제외하고,
+        ### roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 라벨만 남기도록 필터링
+        candidates = targets[(targets.x != 0) | (targets.y != 0)].filter(min_box_area=1000 * self.scale ** 2, max_aspect_ratio=1.7)
+        ############################################################
 
-            if np.any(np.isnan(centroid)):  # 배열에 하나이상의 원소라도 참이라면 true (즉, 하나이상의 중심점이 숫자가 아니면)
-                continue
+        ### 초록색 영역 또는 검정색 영역 위쪽 라인위의 라벨은 무시하도록 필터링
+        #if edge_info:
+        #    if edge_info["EDGE_UP_Y"] > (y+height)//2 :
+        #       continue
+        ########################################
 
-            _, y, width, height, area = stats[idx]
-
-            ### roi의 가로 세로 종횡비를 구한 뒤 1:1의 비율에 근접한 라벨만 남기도록 필터링
-            area_ratio = width / height if height < width else height / width
-            area_ratio = round(area_ratio, 2)
-            #print(area_ratio)
-
-            if not (1000 < width*height and area_ratio <= 1.7):
-                continue
-            ############################################################
-
-            ### 초록색 영역 또는 검정색 영역 위쪽 라인위의 라벨은 무시하도록 필터링
-            #if edge_info:
-            #    if edge_info["EDGE_UP_Y"] > (y+height)//2 :
-            #       continue
-            ########################################
-
-            ### 필터링에서 살아남은 후보 라벨만 Target 객체화 시켜 후보 리스트에 추가
-            candidate = Target(stats=stats[idx], centroid=centroid)
-            ########################################################
-
-            if visualization:
+        if visualization:
+            for candidate in candidates.get_targets():
                 setLabel(canvas, candidate.get_pts(), label=f"MILK POS x:{candidate.x}, y:{candidate.y}", color=(255, 255, 255))
-            candidates.append(candidate)
 
         # if candidates:
         #     if edge_info:
         #         if edge_info["EDGE_UP"] :
         #             #print("필터 적용전", candidates)
-        #             candidates = list(filter(lambda candidate: candidate.y + candidate.height > edge_info["EDGE_UP_Y"], candidates))
+        #             candidates = candidates[candidates.y + candidates.height > edge_info["EDGE_UP_Y"]]
         #             #print("적용 후", candidates)
 
         ### 후보 라벨이 있다면 그중에서 가장 큰 크기 객체의 중심 좌표를 반환
-        if candidates:
-            selected = max(candidates, key=lambda candidate:candidate.get_area())
+        if len(candidates):
+            selected = candidates.get_target(candidates.argmax("area"))
             if visualization:
                 setLabel(canvas, selected.get_pts(), label=f"MILK POS x:{selected.x}, y:{selected.y}",
                          color=(0, 0, 255))
@@ -327,68 +521,98 @@ class ImageProcessor:
 
 
 
-    def line_tracing(self, color: str = "YELLOW", line_visualization:bool=False, edge_visualization:bool=False, ROI:bool=False , ROI_edge:bool=False):
-        src = self.get_image()
+    @scene_cached(min_quality=const.LINE_MIN_QUALITY)
+    def line_tracing(self, color: str = "YELLOW", line_visualization:bool=False, edge_visualization:bool=False, ROI:bool=False , ROI_edge:bool=False, fast:bool=False):
+        """
+        :param fast: edge_info 가 필요 없는 틱이면 True. 곧은 노란 선 하나만 보이면 Hough 대신 get_scanline_lines 결과를 쓴다
+        """
+        # 흔들려서 번진 프레임은 가짜 선을 만들어 쓸데없는 보정 동작을 하게 하므로 선명한 프레임을 쓴다
+        src = self.get_frame(min_quality=const.LINE_MIN_QUALITY)
         if ROI and not ROI_edge:
-            src = src[0:200,:]
+            src = src.crop(0, round(const.LINE_ROI_HEIGHT * self.height), 0, src.shape[1])
         elif ROI_edge and not ROI:
-            src = src[:,0+200:640-200]
-        result = (line_info, edge_info, dst) = self.line_detector.get_all_lines(src=src, color=color, line_visualization = line_visualization, edge_visualization = edge_visualization)
+            x0, x1 = const.LINE_ROI_EDGE_X
+            src = src.crop(0, src.shape[0], round(x0 * self.width), round(x1 * self.width))
+        if fast and color == "YELLOW" and not (line_visualization or edge_visualization):
+            result = self.line_detector.get_scanline_lines(src, color)
+            # 가로선이 지나거나 방향을 틀어야 하는 틱은 Hough 로 자세히 본다
+            if result is not None and not result[0].has_horizontal and \
+                    self.line_checker(result[0]) in [WalkInfo.STRAIGHT, WalkInfo.V_LEFT, WalkInfo.V_RIGHT]:
+                return result
+        segments = tracker = None
+        if self.line_tracking and color == "YELLOW":
+            tracker = self.line_trackers.setdefault((ROI, ROI_edge), LineTracker())
+            segments = tracker.detect(src, color, version=self.get_motion_version())
+        result = (line_info, edge_info, dst) = self.line_detector.get_all_lines(src=src, color=color, line_visualization = line_visualization, edge_visualization = edge_visualization, segments=segments)
+        if tracker is not None:
+            if segments is not None and not tracker.is_found(line_info):
+                # 예측한 곳에 선이 없으면 (크게 움직였거나 잘못 추적) 화면 전체에서 다시 찾는다
+                result = (line_info, edge_info, dst) = self.line_detector.get_all_lines(src=src, color=color, line_visualization = line_visualization, edge_visualization = edge_visualization)
+            tracker.update(line_info, version=self.get_motion_version(), scale=src.scale)
         #print(line_info)
         #print(edge_info)
         if line_visualization or edge_visualization :
+            if color != "BLACK":
+                # 이 영역에서 HoughLinesP 가 찾은 선분 수와 gain (선분이 너무 많아 투표 수를 올렸는지 확인용)
+                controller = HoughController.of(color.lower(), src.shape)
+                dst = cv2.putText(dst.copy(), "segments %d gain %.2f" % (controller.count, controller.gain), (10, 20),
+                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), thickness=1)
             cv2.imshow("line", dst)
             cv2.waitKey(1)
         return result
 
-    def line_checker(self, line_info):
-        if line_info["H"]:
-            if line_info["H_Y"][1] < 240 :
-                if 300 < np.mean(line_info["H_X"]) < 340:
+    def line_checker(self, line_info: LineInfo):
+        # 위치 기준은 화면 크기 대비 비율로 정해두고 처리 해상도의 픽셀로 바꿔서 비교한다
+        direction_x0, direction_x1 = (x * self.width for x in const.DIRECTION_LINE_X)
+        straight_x0, straight_x1 = (x * self.width for x in const.STRAIGHT_LINE_X)
+        if line_info.h:
+            if line_info.h_y1 < const.CORNER_LINE_MAX_Y * self.height :
+                if direction_x0 < line_info.h_x < direction_x1:
                     walk_info = WalkInfo.DIRECTION_LINE
-                elif np.mean(line_info["H_X"]) >= 340:
+                elif line_info.h_x >= direction_x1:
                     walk_info = WalkInfo.CORNER_RIGHT
                 else:
                     walk_info = WalkInfo.CORNER_LEFT
 
             else:
-                if 80 < line_info["DEGREE"] < 100:
-                    if 290 < np.mean(line_info["V_X"]) < 350:
+                if 80 < line_info.degree < 100:
+                    if straight_x0 < line_info.v_x < straight_x1:
                         walk_info = WalkInfo.STRAIGHT
                     else:
-                        if np.mean(line_info["V_X"]) <= 290:
+                        if line_info.v_x <= straight_x0:
                             walk_info = WalkInfo.V_LEFT
-                        elif np.mean(line_info["V_X"]) >= 350:
+                        elif line_info.v_x >= straight_x1:
                             walk_info = WalkInfo.V_RIGHT
-                elif 0 < line_info["DEGREE"] <= 80:
+                elif 0 < line_info.degree <= 80:
                     walk_info = WalkInfo.MODIFY_LEFT
                 else:
                     walk_info = WalkInfo.MODIFY_RIGHT
 
         else:
-            if 80 < line_info["DEGREE"] < 100:
-                if 290 < np.mean(line_info["V_X"]) < 350:
+            if 80 < line_info.degree < 100:
+                if straight_x0 < line_info.v_x < straight_x1:
                     walk_info = WalkInfo.STRAIGHT
                 else:
-                    if np.mean(line_info["V_X"]) <= 290:
+                    if line_info.v_x <= straight_x0:
                         walk_info = WalkInfo.V_LEFT
-                    elif np.mean(line_info["V_X"]) >= 350:
+                    elif line_info.v_x >= straight_x1:
                         walk_info = WalkInfo.V_RIGHT
-            elif 0 < line_info["DEGREE"] <= 80:
+            elif 0 < line_info.degree <= 80:
                 walk_info = WalkInfo.MODIFY_LEFT
-            elif line_info["DEGREE"] == 0:
+            elif line_info.degree == 0:
                 walk_info = WalkInfo.BACKWARD
             else:
                 walk_info = WalkInfo.MODIFY_RIGHT
 
         return walk_info
 
+    @scene_cached(min_quality=const.LINE_MIN_QUALITY)
     def get_yellow_line_corner(self, visualization=False):
         """
 
         :return: if corner exist return (cx, cy) else return None
         """
-        src = self.get_image()
+        src = self.get_frame(min_quality=const.LINE_MIN_QUALITY)
         corner = CornerFinder.get_yellow_line_corner_pos(src=src, visualization=visualization)
 
         return corner
@@ -398,17 +622,19 @@ class ImageProcessor:
 
         :return: if corner exist return (cx, cy) else return None
         """
-        src = self.get_image()
+        src = self.get_frame(min_quality=const.LINE_MIN_QUALITY)
         corner = CornerFinder.get_yellow_line_corner_pos(src=src, visualization=visualization)
 
         return corner
 
     def is_out_of_black(self, visualization=False) -> bool:
-        src = self.get_image()
-        begin = (bx, by) = (160, 200)
-        end = (ex, ey) = (480, 420)
+        frame = self.get_frame()
+        src = frame.src
+        x0, y0, x1, y1 = const.BLACK_AREA_ROI
+        begin = (bx, by) = self.to_pixels((x0, y0))
+        end = (ex, ey) = self.to_pixels((x1, y1))
 
-        mask = ColorPreProcessor.get_black_mask(src=src[by:ey, bx:ex])
+        mask = ColorPreProcessor.get_black_mask(src=frame.crop(by, ey, bx, ex))
 
         rate = np.count_nonzero(mask) / ((ex-bx) * (ey-by))
         rate *= 100
@@ -422,10 +648,11 @@ class ImageProcessor:
 
         return rate <= 30
 
+    @scene_cached()
     def check_area_color(self):
-        src = self.get_image()
+        src = self.get_frame()
         mask = ColorPreProcessor.get_green_mask(src=src)
-        rate = np.count_nonzero(mask)/(640*480)
+        rate = np.count_nonzero(mask)/mask.size
         rate *= 100
         print(rate)
         return rate >= const.CHECK_AREA_GREEN_RATE_THRESH
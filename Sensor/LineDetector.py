@@ -2,9 +2,19 @@ import cv2
 import numpy as np
 import math
 from Sensor.ColorPreProcessor import ColorPreProcessor
+from Sensor.Frame import Frame
+from Sensor.HoughController import HoughController
+from Sensor.LineInfo import LineInfo, EdgeInfo
+from Constant import const
 
 
 class LineDetector:
+    # 선분 묶음. 한 선분이 여러 묶음에 들어갈 수 있다 (ALL 은 모든 선분, COMPACT_HORIZONTAL 은 HORIZONTAL 의 일부 등)
+    ALL, EDGE_L, EDGE_R, HORIZONTAL, COMPACT_HORIZONTAL, LINES, VERTICAL = range(7)
+    GROUPS = 7
+    # reduce_segments 통계 열
+    COUNT, MIN_X, MAX_X, MIN_Y, MAX_Y, MEAN_Y, MEAN_DEGREE = range(7)
+
     def __init__(self):
         pass
 
@@ -73,67 +83,103 @@ class LineDetector:
             return ColorPreProcessor.get_yellow_mask(src)
 
 
-    def get_lines(self, src, color='YELLOW'):
-        mask = self.mask_color(src, color)
+    def get_lines(self, src, color='YELLOW', segments=None):
+        """
+        :return: BLACK 이면 mask 의 외곽선. 아니면 (선분 (N, 4), 묶음 코드 (N,), 묶음별 통계), 선분이 2개 미만이면 N = 0
+        """
+        # mask, edge, 선분은 Frame 노드라서 같은 프레임에서는 CornerFinder 등과 공유한다
+        # segments: 미리 찾은 선분 (LineTracker 가 예측 영역에서 찾은 것), 없으면 화면 전체의 선분 노드
+        frame = Frame.of(src)
+        mask = frame.get(color.lower() + "_mask")
         cv2.imshow("mask", mask)
         if color == 'BLACK':
             contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             return contours
         else:
-            edges = cv2.Canny(mask, 75, 150)
-            lines = cv2.HoughLinesP(edges, 1, 1 * np.pi / 180, 30, np.array([]), minLineLength=50, maxLineGap=150)
+            lines = frame.get(color.lower() + "_segments") if segments is None else segments
             lines = np.squeeze(lines)
 
-            if len(lines.shape) == 0:
-                return [], [], [], [], [], [], [], 0
-            elif len(lines.shape) == 1:
-                return [], [], [], [], [], [], [], 0
-            else:
-                slope_degree = (np.arctan2(lines[:, 1] - lines[:, 3], lines[:, 0] - lines[:, 2]) * 180) / np.pi
-
-                edge_lines = lines[:, None]
-
-                edge_lines_L = lines[(slope_degree) < 0]
-                edge_lines_L_degree = slope_degree[(slope_degree) < 0]
-                edge_lines_L = edge_lines_L[:, None]
-
-                edge_lines_R = lines[(slope_degree) > 0]
-                edge_lines_R_degree = slope_degree[(slope_degree) > 0]
-                edge_lines_R = edge_lines_R[:, None]
-
-                horizontal_lines = lines[np.abs(slope_degree) > 170]
-                horizontal_slope_degree = slope_degree[np.abs(slope_degree) > 170]
-                H_degree = 0
-                H_degree = np.mean(np.abs(horizontal_slope_degree))
-                #print(H_degree)
-                horizontal_lines = horizontal_lines[:, None]
-                
-                compact_horizontal_lines = lines[np.abs(slope_degree) > 175]
-                compact_horizontal_lines_degree = slope_degree[np.abs(slope_degree) > 175]
-                #print(compact_horizontal_lines_degree)
-                compact_horizontal_lines = compact_horizontal_lines[:, None]
-
-                lines = lines[np.abs(slope_degree) < 150]
-                slope_degree = slope_degree[np.abs(slope_degree) < 150]
-
-                vertical_lines = lines[np.abs(slope_degree) < 110]
-                vertical_slope_degree = slope_degree[np.abs(slope_degree) < 110]
-                vertical_lines = vertical_lines[np.abs(vertical_slope_degree) > 70]
-                vertical_slope_degree = vertical_slope_degree[np.abs(vertical_slope_degree) > 70]
-                vertical_lines = vertical_lines[:, None]
-
-                lines = lines[:, None]
-
-                return lines, horizontal_lines,vertical_lines,edge_lines,edge_lines_L,edge_lines_R ,compact_horizontal_lines, H_degree
+            if len(lines.shape) < 2:
+                lines = np.empty((0, 4), dtype=np.int32)
+            slope_degree, codes = self.classify_segments(lines)
+            return lines, codes, self.reduce_segments(lines, slope_degree, codes)
+
+    @classmethod
+    def classify_segments(cls, lines):
+        """선분마다 들어가는 묶음의 비트(1 << 묶음)를 더한 코드를 한 번에 매긴다.
+        :param lines: (N, 4) [x1, y1, x2, y2]
+        :return: (기울기 (도), 묶음 코드)
+        """
+        slope_degree = (np.arctan2(lines[:, 1] - lines[:, 3], lines[:, 0] - lines[:, 2]) * 180) / np.pi
+        degree = np.abs(slope_degree)
+        codes = (1 << cls.ALL) \
+            + (slope_degree < 0) * (1 << cls.EDGE_L) \
+            + (slope_degree > 0) * (1 << cls.EDGE_R) \
+            + (degree > 170) * (1 << cls.HORIZONTAL) \
+            + (degree > 175) * (1 << cls.COMPACT_HORIZONTAL) \
+            + (degree < 150) * (1 << cls.LINES) \
+            + ((70 < degree) & (degree < 110)) * (1 << cls.VERTICAL)
+        return slope_degree, codes
+
+    @classmethod
+    def reduce_segments(cls, lines, slope_degree, codes):
+        """묶음마다 끝점의 x, y 최소 / 최대, y 평균과 |기울기| 평균을 한 번에 구한다.
+        :return: (묶음, 통계) 배열. 열은 COUNT, MIN_X, MAX_X, MIN_Y, MAX_Y, MEAN_Y, MEAN_DEGREE. 선분이 없는 묶음은 모두 0
+        """
+        stats = np.zeros((cls.GROUPS, 7))
+        if len(lines) == 0:
+            return stats
+        member = (codes[:, None] >> np.arange(cls.GROUPS)) & 1 == 1
+        x1, y1, x2, y2 = lines.T
+        # 최대는 부호를 바꿔 최소로 구해서 네 값을 한 번에 줄인다
+        ends = np.stack([np.minimum(x1, x2), -np.maximum(x1, x2), np.minimum(y1, y2), -np.maximum(y1, y2)], axis=1)
+        extremes = np.where(member[:, :, None], ends[:, None, :], np.iinfo(ends.dtype).max).min(axis=0)
+        count = np.count_nonzero(member, axis=0)
+        sums = member.T @ np.stack([y1 + y2, np.abs(slope_degree)], axis=1)
+
+        found = count > 0
+        stats[:, cls.COUNT] = count
+        stats[found, cls.MIN_X:cls.MAX_Y + 1] = extremes[found] * [1, -1, 1, -1]
+        stats[found, cls.MEAN_Y] = sums[found, 0] / (2 * count[found])
+        stats[found, cls.MEAN_DEGREE] = sums[found, 1] / count[found]
+        return stats
+
+    @classmethod
+    def get_group(cls, lines, codes, group):
+        """묶음에 든 선분 (M, 1, 4)"""
+        return lines[(codes >> group) & 1 == 1][:, None]
+
+    def get_group_line(self, stats, group, what_line, scale: float = 1.0):
+        """get_fitline 의 horizontal, horizontal_D, compact_horizontal, edge_UP, edge_DOWN, edge_R, edge_L, all 과 같은 결과를
+        reduce_segments 의 묶음 통계로 만든다.
+        """
+        _, min_x, max_x, min_y, max_y, middle, _ = stats[group]
+        min_x, max_x, min_y, max_y, middle = int(min_x), int(max_x), int(min_y), int(max_y), int(middle)
+        if what_line == 'horizontal' or what_line == 'compact_horizontal':
+            return [min_x, middle, max_x, middle]
+        elif what_line == 'horizontal_D':
+            return [min_x, min_y + round(10 * scale), max_x, max_y - round(10 * scale)]
+        elif what_line == 'edge_UP':
+            return [max_x, min_y, min_x, min_y]
+        elif what_line == 'edge_DOWN':
+            return [max_x, max_y, min_x, max_y]
+        elif what_line == 'edge_R':
+            return [max_x, min_y, min_x, max_y]
+        else: # 'edge_L', 'all'
+            return [min_x, min_y, max_x, max_y]
 
-    def get_fitline(self, src, f_lines, size, what_line):
+    def get_fitline(self, src, f_lines, size, what_line, scale: float = 1.0):
+        """:param scale: 기준 해상도 대비 배율 (Frame.scale)"""
         lines = np.squeeze(f_lines)
         lines = lines.reshape(size, 2)
         if what_line == 'vertical':
             output = cv2.fitLine(lines, cv2.DIST_L2, 0, 0.01, 0.01)
             vx, vy, x, y = output[0], output[1], output[2], output[3]
+            # 선분이 모두 완전히 수평이면 vy 가 0 이라 x 가 inf 가 된다
+            if vy == 0:
+                vy = np.float32(1e-6)
             x1, y1 = int(((src.shape[0] - 1) - y) / vy * vx + x), src.shape[0] - 1
-            x2, y2 = int(((src.shape[0] / 2 + 200) - y) / vy * vx + x), int(src.shape[0] / 2)
+            x2, y2 = int(((src.shape[0] / 2 + 200 * scale) - y) / vy * vx + x), int(src.shape[0] / 2)
             result = [x2, y2, x1, y1]
             return result
         elif what_line == 'horizontal':
@@ -149,8 +195,8 @@ class LineDetector:
             #middle=int(lines.mean(axis=0)[1])
             min_x = int(lines.min(axis=0)[0])
             max_x = int(lines.max(axis=0)[0])
-            min_y = int(lines.min(axis=0)[1]) + 10
-            max_y = int(lines.max(axis=0)[1]) - 10
+            min_y = int(lines.min(axis=0)[1]) + round(10 * scale)
+            max_y = int(lines.max(axis=0)[1]) - round(10 * scale)
             #result = [min_x, middle, max_x, middle]
             result = [min_x, min_y, max_x, max_y ]
             return result
@@ -201,7 +247,7 @@ class LineDetector:
         else:
             result = [ xMin, yMax, xMax, yMax]
 
-    def get_fitline__(self, img, f_lines):
+    def get_fitline__(self, img, f_lines, scale: float = 1.0):
         lines = np.squeeze(f_lines)
         if len(lines.shape) == 1:
             lines = lines.reshape(int(lines.shape[0] / 2), 2)
@@ -209,19 +255,26 @@ class LineDetector:
             lines = lines.reshape(lines.shape[0] * 2, 2)
         output = cv2.fitLine(lines, cv2.DIST_L2, 0, 0.01, 0.01)
         vx, vy, x, y = output[0], output[1], output[2], output[3]
+        # 선분이 모두 완전히 수평이면 vy 가 0 이라 x 가 inf 가 된다
+        if vy == 0:
+            vy = np.float32(1e-6)
         x1, y1 = int(((img.shape[0] - 1) - y) / vy * vx + x), img.shape[0] - 1
-        x2, y2 = int(((img.shape[0] / 2 + 200) - y) / vy * vx + x), int(img.shape[0] / 2 + 200)
+        x2, y2 = int(((img.shape[0] / 2 + 200 * scale) - y) / vy * vx + x), int(img.shape[0] / 2 + 200 * scale)
         result = [x1, y1, x2, y2]
         return result
 
-    def get_all_lines(self, src, color='YELLOW', line_visualization=False, edge_visualization=False):
+    def get_all_lines(self, src, color='YELLOW', line_visualization=False, edge_visualization=False, segments=None):
+        frame = Frame.of(src)
+        src = frame.src
+        # 길이 기준 등 픽셀 단위 값은 기준 해상도(640x480)에서 정한 값이므로 처리 해상도 배율을 곱한다
+        scale = frame.scale
         temp = np.zeros((src.shape[0], src.shape[1], 3), dtype=np.uint8)
 
         if color == 'BLACK':
             contours = None
-            line_info = { }
-            edge_info = {'EDGE_DOWN': False, 'EDGE_DOWN_X': 0, 'EDGE_DOWN_Y': 0, 'EDGE_UP_Y': 0, 'EDGE_UP':False, 'EDGE_UP_X':0}
-            contours = self.get_lines(src, color)
+            line_info = LineInfo(color)
+            edge_info = EdgeInfo(color)
+            contours = self.get_lines(frame, color)
 
             if len(contours) != 0:
                 contour = max(contours, key=lambda x:cv2.contourArea(x))
@@ -230,15 +283,16 @@ class LineDetector:
                 topmost = tuple(contour[contour[:,:,1].argmin()][0])
                 bottommost = tuple(contour[contour[:,:,1].argmax()][0])
 
-                edge_contour_line_DOWN = [ 10, bottommost[1], 600, bottommost[1]]
-                edge_contour_line_UP = [ 10, topmost[1], 600, topmost[1]]
+                x0, x1 = round(10 * scale), round(600 * scale)
+                edge_contour_line_DOWN = [ x0, bottommost[1], x1, bottommost[1]]
+                edge_contour_line_UP = [ x0, topmost[1], x1, topmost[1]]
                 
-                edge_info["EDGE_UP"] = True     
-                edge_info["EDGE_UP_X"] = [ edge_contour_line_UP[0] , edge_contour_line_UP[2]]
-                edge_info["EDGE_UP_Y"] = edge_contour_line_UP[1]
-                edge_info["EDGE_DOWN"] = True
-                edge_info["EDGE_DOWN_X"] = [ edge_contour_line_DOWN[0] , edge_contour_line_DOWN[2]]
-                edge_info["EDGE_DOWN_Y"] = edge_contour_line_DOWN[1]
+                edge_info.edge_up = True     
+                edge_info.edge_up_x = [ edge_contour_line_UP[0] , edge_contour_line_UP[2]]
+                edge_info.edge_up_y = edge_contour_line_UP[1]
+                edge_info.edge_down = True
+                edge_info.edge_down_x = [ edge_contour_line_DOWN[0] , edge_contour_line_DOWN[2]]
+                edge_info.edge_down_y = edge_contour_line_DOWN[1]
 
                 if edge_visualization is True:
                     self.draw_lines(temp, edge_contour_line_UP, 'horizontal', 'fit') # green line
@@ -250,124 +304,114 @@ class LineDetector:
                 
 
         else:
-            lines, horizontal_lines,vertical_lines,edge_lines,edge_lines_L,edge_lines_R ,compact_horizontal_lines, H_degree = self.get_lines(src, color)
+            # 선분을 한 번에 묶음별로 나누고, 묶음별 최소 / 최대 / 평균은 한 번에 구해둔다 (get_group_line)
+            lines, codes, stats = self.get_lines(frame, color, segments)
+            count = stats[:, self.COUNT]
 
             if color == 'YELLOW':
-                line_info = {"DEGREE": 0, "ALL_X": [0, 0], 'ALL_Y': [0, 0], "V": False, "V_X": [0, 0], "V_Y": [0, 0],"H_DEGREE" : 0, "H": False, "H_X": [0, 0],
-                            "H_Y": [0, 0], "compact_H": False, "compact_H_X": [0, 0], "compact_H_Y": [0, 0]}
-                edge_info = {"EDGE_POS": None, "EDGE_L": False, "L_X": [0, 0], "L_Y": [0, 0], "EDGE_R": False,
-                            "R_X": [0, 0], "R_Y": [0, 0]}
-
-                if len(lines) != 0:
-                    size = int(lines.shape[0] * 2)
-                    fit_line = self.get_fitline__(src, lines)
+                line_info = LineInfo(color)
+                edge_info = EdgeInfo(color)
+
+                if count[self.LINES] != 0:
+                    fit_line = self.get_fitline__(src, self.get_group(lines, codes, self.LINES), scale)
                     line_degree = (np.arctan2(fit_line[1] - fit_line[3], fit_line[0] - fit_line[2]) * 180) / np.pi
-                    line_info["DEGREE"] = np.abs(np.abs(line_degree)-180)
+                    line_info.degree = np.abs(np.abs(line_degree)-180)
                     if line_visualization is True:
                         self.draw_lines(temp, fit_line, 'lines', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(vertical_lines) != 0:
+                if count[self.VERTICAL] != 0:
+                    vertical_lines = self.get_group(lines, codes, self.VERTICAL)
                     size = int(vertical_lines.shape[0] * vertical_lines.shape[2] / 2)
-                    vertical_fit_line = self.get_fitline(src, vertical_lines, size, 'vertical')
-                    line_info["V"] = True
-                    line_info["V_X"] = [vertical_fit_line[0], vertical_fit_line[2]]  # [x1,y1,x2,y2]
-                    line_info["V_Y"] = [vertical_fit_line[1], vertical_fit_line[3]]
+                    vertical_fit_line = self.get_fitline(src, vertical_lines, size, 'vertical', scale)
+                    line_info.v = True
+                    line_info.v_x0, line_info.v_x1 = vertical_fit_line[0], vertical_fit_line[2]  # [x1,y1,x2,y2]
+                    line_info.v_y0, line_info.v_y1 = vertical_fit_line[1], vertical_fit_line[3]
                     if line_visualization is True:
                         self.draw_lines(temp, vertical_fit_line, 'vertical', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(horizontal_lines) != 0:
-                    #print(horizontal_lines)
-                    #print(horizontal_lines.shape)
-                    size = int(horizontal_lines.shape[0] * horizontal_lines.shape[2] / 2)
-                    horizontal_fit_line = self.get_fitline(src, horizontal_lines, size, 'horizontal')
-                    horizontal_D_fit_line = self.get_fitline(src, horizontal_lines, size, 'horizontal_D')
+                if count[self.HORIZONTAL] != 0:
+                    horizontal_fit_line = self.get_group_line(stats, self.HORIZONTAL, 'horizontal', scale)
+                    horizontal_D_fit_line = self.get_group_line(stats, self.HORIZONTAL, 'horizontal_D', scale)
                     a = horizontal_fit_line[1] - horizontal_fit_line[3]
                     b = horizontal_fit_line[0] - horizontal_fit_line[2]
                     c = math.sqrt((a * a) + (b * b))
-                    if c >= 200:
-                        line_info["H"] = True
+                    if c >= 200 * scale:
+                        line_info.h = True
                     
                     #H_degree = (np.arctan2(horizontal_D_fit_line[1] - horizontal_D_fit_line[3], horizontal_D_fit_line[0] - horizontal_D_fit_line[2]) * 180) / np.pi
-                    line_info["H_DEGREE"] = H_degree
-                    line_info["H_X"] = [horizontal_fit_line[0], horizontal_fit_line[2]]  # [min_x, middle, max_x, middle]
-                    line_info["H_Y"] = [horizontal_fit_line[1], horizontal_fit_line[3]]
+                    line_info.h_degree = stats[self.HORIZONTAL, self.MEAN_DEGREE]
+                    line_info.h_x0, line_info.h_x1 = horizontal_fit_line[0], horizontal_fit_line[2]  # [min_x, middle, max_x, middle]
+                    line_info.h_y0, line_info.h_y1 = horizontal_fit_line[1], horizontal_fit_line[3]
                     if line_visualization is True:
                         self.draw_lines(temp, horizontal_D_fit_line, 'horizontal_D', 'fit')
                         self.draw_lines(temp, horizontal_fit_line, 'horizontal', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(compact_horizontal_lines) != 0:
-                    #print(compact_horizontal_lines)
-                    #print(compact_horizontal_lines.shape)
-                    size = int(compact_horizontal_lines.shape[0] * compact_horizontal_lines.shape[2] / 2)
-                    compact_horizontal_line = self.get_fitline(src, compact_horizontal_lines, size, 'compact_horizontal')
+                if count[self.COMPACT_HORIZONTAL] != 0:
+                    compact_horizontal_line = self.get_group_line(stats, self.COMPACT_HORIZONTAL, 'compact_horizontal', scale)
                     a = compact_horizontal_line[1] - compact_horizontal_line[3]
                     b = compact_horizontal_line[0] - compact_horizontal_line[2]
                     c = math.sqrt((a * a) + (b * b))
                     #print(c)
-                    if c >= 100:
-                        line_info["compact_H"] = True
+                    if c >= 100 * scale:
+                        line_info.compact_h = True
                     #H_degree = (np.arctan2(horizontal_fit_line[1] - horizontal_fit_line[3], horizontal_fit_line[0] - horizontal_fit_line[2]) * 180) / np.pi
                     #line_info["H_DEGREE"] = H_degree
                     
-                    line_info["compact_H_X"] = [compact_horizontal_line[0], compact_horizontal_line[2]]  # [min_x, middle, max_x, middle]
-                    line_info["compact_H_Y"] = [compact_horizontal_line[1], compact_horizontal_line[3]]
+                    line_info.compact_h_x0, line_info.compact_h_x1 = compact_horizontal_line[0], compact_horizontal_line[2]  # [min_x, middle, max_x, middle]
+                    line_info.compact_h_y0, line_info.compact_h_y1 = compact_horizontal_line[1], compact_horizontal_line[3]
                     if line_visualization is True:
                         # self.draw_lines(temp, horizontal_fit_line, 'horizontal')
                         self.draw_lines(temp, compact_horizontal_line, 'compact_horizontal', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(edge_lines) != 0:
-                    size = int(edge_lines.shape[0] * edge_lines.shape[2] / 2)
-                    edge_fit_line_DOWN = self.get_fitline(src, edge_lines, size, 'edge_DOWN')
-                    line_info["ALL_X"] = [edge_fit_line_DOWN[2], edge_fit_line_DOWN[0]]  # [min_x, min_y, max_x, max_y]
-                    line_info["ALL_Y"] = [edge_fit_line_DOWN[1], edge_fit_line_DOWN[3]]
+                if count[self.ALL] != 0:
+                    edge_fit_line_DOWN = self.get_group_line(stats, self.ALL, 'edge_DOWN', scale)
+                    line_info.all_x0, line_info.all_x1 = edge_fit_line_DOWN[2], edge_fit_line_DOWN[0]  # [min_x, min_y, max_x, max_y]
+                    line_info.all_y0, line_info.all_y1 = edge_fit_line_DOWN[1], edge_fit_line_DOWN[3]
                     if edge_visualization is True:
                         self.draw_lines(temp, edge_fit_line_DOWN, 'edge', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(edge_lines_L) != 0:
-                    size = int(edge_lines_L.shape[0] * edge_lines_L.shape[2] / 2)
-                    edge_line_L = self.get_fitline(src, edge_lines_L, size, 'edge_L')
-                    edge_info["EDGE_L"] = True
-                    edge_info["L_X"] = [edge_line_L[0], edge_line_L[2]]  # [min_x, min_y, max_x, max_y]
-                    edge_info["L_Y"] = [edge_line_L[1], edge_line_L[3]]
+                if count[self.EDGE_L] != 0:
+                    edge_line_L = self.get_group_line(stats, self.EDGE_L, 'edge_L', scale)
+                    edge_info.edge_l = True
+                    edge_info.l_x0, edge_info.l_x1 = edge_line_L[0], edge_line_L[2]  # [min_x, min_y, max_x, max_y]
+                    edge_info.l_y0, edge_info.l_y1 = edge_line_L[1], edge_line_L[3]
                     if edge_visualization is True:
                         self.draw_lines(temp, edge_line_L, 'edge_L', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(edge_lines_R) != 0:
-                    size = int(edge_lines_R.shape[0] * edge_lines_R.shape[2] / 2)
-                    edge_line_R = self.get_fitline(src, edge_lines_R, size, 'edge_R')
-                    edge_info["EDGE_R"] = True
-                    edge_info["R_X"] = [edge_line_R[2], edge_line_R[0]]  # [max_x, min_y, min_x, max_y]
-                    edge_info["R_Y"] = [edge_line_R[1], edge_line_R[3]]
+                if count[self.EDGE_R] != 0:
+                    edge_line_R = self.get_group_line(stats, self.EDGE_R, 'edge_R', scale)
+                    edge_info.edge_r = True
+                    edge_info.r_x0, edge_info.r_x1 = edge_line_R[2], edge_line_R[0]  # [max_x, min_y, min_x, max_y]
+                    edge_info.r_y0, edge_info.r_y1 = edge_line_R[1], edge_line_R[3]
                     if edge_visualization is True:
                         self.draw_lines(temp, edge_line_R, 'edge_R', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(edge_lines) != 0 and len(edge_lines_L) != 0 and len(edge_lines_R) != 0 and edge_info["R_X"][0] > edge_info["L_X"][0]:
+                if count[self.ALL] != 0 and count[self.EDGE_L] != 0 and count[self.EDGE_R] != 0 and edge_info.r_x0 > edge_info.l_x0:
                     x_center = int((edge_line_L[2] + edge_line_R[2]) / 2)
                     y_center = edge_fit_line_DOWN[1]  # [max_x, max_y, min_x, max_y]
-                    edge_info["EDGE_POS"] = [x_center, y_center]
+                    edge_info.edge_pos = [x_center, y_center]
                     if edge_visualization is True:
                         temp = cv2.line(temp, (x_center, y_center), (x_center, y_center), (0,0,255), 20)
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
                 else:
-                    edge_info["EDGE_POS"] = None
+                    edge_info.edge_pos = None
 
             elif color == 'GREEN':
-                line_info = {'ALL': False,'ALL_X': [0, 0], 'ALL_Y': [0, 0], 'V': False, 'V_X': [0, 0], 'V_Y': [0, 0], 'H': False, "len(H)":0, 'H_DEGREE': 0 , 'H_X': [0, 0], 'H_Y': [0, 0]}
-                edge_info = {'EDGE_DOWN': False, 'len(EDGE)': 0, 'EDGE_DOWN_X': 0, 'EDGE_DOWN_Y': 0, 'EDGE_UP_Y': 0, 'EDGE_UP':False, 'EDGE_UP_X':0}
+                line_info = LineInfo(color)
+                edge_info = EdgeInfo(color)
 
-                if len(edge_lines) != 0:
-                    size = int(edge_lines.shape[0] * edge_lines.shape[2] / 2)
-                    line = self.get_fitline(src, edge_lines, size, 'all')
-                    line_info["ALL"] = True
-                    line_info["ALL_X"] = [line[0], line[2]]  # [min_x, min_y, max_x, max_y]
-                    line_info["ALL_Y"] = [line[1], line[3]]
+                if count[self.ALL] != 0:
+                    line = self.get_group_line(stats, self.ALL, 'all', scale)
+                    line_info.all = True
+                    line_info.all_x0, line_info.all_x1 = line[0], line[2]  # [min_x, min_y, max_x, max_y]
+                    line_info.all_y0, line_info.all_y1 = line[1], line[3]
 
                     # size = int(lines.shape[0]*2)
                     # fit_line = self.get_fitline__(src, lines)
@@ -378,61 +422,57 @@ class LineDetector:
                         self.draw_lines(temp, line, 'lines', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
                         
-                if len(vertical_lines) != 0:
+                if count[self.VERTICAL] != 0:
+                    vertical_lines = self.get_group(lines, codes, self.VERTICAL)
                     size = int(vertical_lines.shape[0] * vertical_lines.shape[2] / 2)
-                    vertical_fit_line = self.get_fitline(src, vertical_lines, size, 'vertical')
-                    line_info["V"] = True
-                    line_info["V_X"] = [vertical_fit_line[0], vertical_fit_line[2]]  # [x1,y1,x2,y2]
-                    line_info["V_Y"] = [vertical_fit_line[1], vertical_fit_line[3]]
+                    vertical_fit_line = self.get_fitline(src, vertical_lines, size, 'vertical', scale)
+                    line_info.v = True
+                    line_info.v_x0, line_info.v_x1 = vertical_fit_line[0], vertical_fit_line[2]  # [x1,y1,x2,y2]
+                    line_info.v_y0, line_info.v_y1 = vertical_fit_line[1], vertical_fit_line[3]
                     if line_visualization is True:
                         self.draw_lines(temp, vertical_fit_line, 'vertical', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
 
-                if len(compact_horizontal_lines) != 0:
-                    #print(compact_horizontal_lines)
-                    #print(compact_horizontal_lines.shape)
-                    size = int(compact_horizontal_lines.shape[0] * compact_horizontal_lines.shape[2] / 2)
-                    compact_horizontal_line = self.get_fitline(src, compact_horizontal_lines, size, 'compact_horizontal')
+                if count[self.COMPACT_HORIZONTAL] != 0:
+                    compact_horizontal_line = self.get_group_line(stats, self.COMPACT_HORIZONTAL, 'compact_horizontal', scale)
                     
-                    size_ = int(horizontal_lines.shape[0] * horizontal_lines.shape[2] / 2)
-                    horizontal_D_fit_line = self.get_fitline(src, horizontal_lines, size_, 'horizontal_D')
+                    horizontal_D_fit_line = self.get_group_line(stats, self.HORIZONTAL, 'horizontal_D', scale)
                     
                     #H_degree = (np.arctan2(horizontal_D_fit_line[1] - horizontal_D_fit_line[3], horizontal_D_fit_line[0] - horizontal_D_fit_line[2]) * 180) / np.pi
-                    line_info["H_DEGREE"] = H_degree
+                    line_info.h_degree = stats[self.HORIZONTAL, self.MEAN_DEGREE]
                     
                     a = compact_horizontal_line[1] - compact_horizontal_line[3]
                     b = compact_horizontal_line[0] - compact_horizontal_line[2]
                     c = math.sqrt((a * a) + (b * b))
                     #print('length:  ', c)
-                    if c >= 350:
-                        line_info["H"] = True
-                        line_info["len(H)"] = c
+                    if c >= 350 * scale:
+                        line_info.h = True
+                        line_info.len_h = c
                     #print(compact_horizontal_line[3])
                     #H_degree = (np.arctan2(horizontal_fit_line[1] - horizontal_fit_line[3], horizontal_fit_line[0] - horizontal_fit_line[2]) * 180) / np.pi
                     #line_info["H_DEGREE"] = H_degree
-                    line_info["H_X"] = [compact_horizontal_line[0], compact_horizontal_line[2]]  # [min_x, middle, max_x, middle]
-                    line_info["H_Y"] = [compact_horizontal_line[1], compact_horizontal_line[3]]
+                    line_info.h_x0, line_info.h_x1 = compact_horizontal_line[0], compact_horizontal_line[2]  # [min_x, middle, max_x, middle]
+                    line_info.h_y0, line_info.h_y1 = compact_horizontal_line[1], compact_horizontal_line[3]
                     if line_visualization is True:
                         # self.draw_lines(temp, horizontal_fit_line, 'horizontal')
                         self.draw_lines(temp, compact_horizontal_line, 'compact_horizontal', 'fit')
                         src = cv2.addWeighted(src, 1, temp, 1., 0.)
                 # edge_info = {'EDGE_DOWN': False, 'EDGE_DOWN_Y':0, 'EDGE_UP_Y': 0}
-                if len(edge_lines) != 0:
-                    size = int(edge_lines.shape[0] * edge_lines.shape[2] / 2)
-                    edge_info["EDGE_UP"] = True
-                    edge_fit_line_UP = self.get_fitline(src, edge_lines, size, 'edge_UP')
-                    edge_fit_line_DOWN = self.get_fitline(src, edge_lines, size, 'edge_DOWN')
-                    edge_info["EDGE_UP_X"] = int((edge_fit_line_UP[0] + edge_fit_line_UP[2])/2)
-                    edge_info["EDGE_UP_Y"] = edge_fit_line_UP[1]
+                if count[self.ALL] != 0:
+                    edge_info.edge_up = True
+                    edge_fit_line_UP = self.get_group_line(stats, self.ALL, 'edge_UP', scale)
+                    edge_fit_line_DOWN = self.get_group_line(stats, self.ALL, 'edge_DOWN', scale)
+                    edge_info.edge_up_x = int((edge_fit_line_UP[0] + edge_fit_line_UP[2])/2)
+                    edge_info.edge_up_y = edge_fit_line_UP[1]
                     
-                    edge_info["EDGE_DOWN"] = True
-                    edge_info["EDGE_DOWN_X"] = int((edge_fit_line_DOWN[0] + edge_fit_line_DOWN[2]) / 2)
-                    edge_info["EDGE_DOWN_Y"] = edge_fit_line_DOWN[1]
+                    edge_info.edge_down = True
+                    edge_info.edge_down_x = int((edge_fit_line_DOWN[0] + edge_fit_line_DOWN[2]) / 2)
+                    edge_info.edge_down_y = edge_fit_line_DOWN[1]
                     a = edge_fit_line_DOWN[1] - edge_fit_line_DOWN[3]
                     b = edge_fit_line_DOWN[0] - edge_fit_line_DOWN[2]
                     c = math.sqrt((a * a) + (b * b))
                     #print('length:  ', c)
-                    edge_info["len(EDGE)"] = np.abs(b)
+                    edge_info.len_edge = np.abs(b)
                         
                     if edge_visualization is True:
                         self.draw_lines(temp, edge_fit_line_UP, 'edge', 'fit')
@@ -442,6 +482,142 @@ class LineDetector:
 
         return line_info, edge_info, src
 
+    def get_scanline_lines(self, src, color='YELLOW'):
+        """Hough 변환 없이 mask 의 몇 줄만 보고 노란 선 하나를 따라가는 빠른 검출.
+        const.SCANLINE_ROWS 개 행에서 mask 의 무게중심 x 를 구해 x = a + b * y 를 최소제곱으로 맞추고,
+        덮인 폭이 넓은 행은 가로선이 지나는 행으로 본다. line_info 는 get_all_lines 의 YELLOW 결과와 같은 키를 채운다.
+        :return: (line_info, edge_info, src). 한 행에 덩어리가 여러 개이거나 직선에 잘 맞지 않으면 None (get_all_lines 를 써야 함)
+        """
+        frame = Frame.of(src)
+        src = frame.src
+        scale = frame.scale
+        line_info = LineInfo(color)
+        edge_info = EdgeInfo(color)
+
+        mask = frame.get(color.lower() + "_mask")
+        h, w = mask.shape[:2]
+        ys = np.linspace(0, h - 1, const.SCANLINE_ROWS).round().astype(np.intp)
+        on = mask[ys] > 0
+        count = np.count_nonzero(on, axis=1)
+        first = on.argmax(axis=1)
+        last = w - 1 - on[:, ::-1].argmax(axis=1)
+        centroid = on.dot(np.arange(w)) / np.maximum(count, 1)
+
+        crossing = count >= const.SCANLINE_H_WIDTH * scale
+        vertical = (count >= const.SCANLINE_MIN_WIDTH * scale) & ~crossing
+        if np.count_nonzero(vertical) < const.SCANLINE_MIN_ROWS:
+            return None
+        # 덩어리 사이 빈 칸이 있으면 선이 여러 개이거나 잡음
+        if (last - first + 1 - count)[vertical].max() > const.SCANLINE_MAX_GAP * scale:
+            return None
+        # 화면 가장자리에 걸린 선은 잘려서 무게중심이 치우친다
+        if (first[vertical] == 0).any() or (last[vertical] == w - 1).any():
+            return None
+
+        y, x = ys[vertical].astype(np.float64), centroid[vertical]
+        (a, b), *_ = np.linalg.lstsq(np.stack([np.ones_like(y), y], axis=1), x, rcond=None)
+        if np.sqrt(np.mean((x - (a + b * y)) ** 2)) > const.SCANLINE_MAX_RESIDUAL * scale:
+            return None
+
+        # get_fitline__ 과 같은 방향: 아래쪽 끝에서 위쪽 끝을 보는 각도
+        line_info.degree = 180 - np.degrees(np.arctan2(1, b))
+        if 70 < line_info.degree < 110:
+            line_info.v = True
+            line_info.v_x0, line_info.v_x1 = int(a + b * (h / 2 + 200 * scale)), int(a + b * (h - 1))
+            line_info.v_y0, line_info.v_y1 = int(h / 2), h - 1
+        if crossing.any():
+            min_x, max_x = int(first[crossing].min()), int(last[crossing].max())
+            middle = int(ys[crossing].mean())
+            line_info.h = max_x - min_x >= 200 * scale
+            line_info.h_x0, line_info.h_x1 = min_x, max_x
+            line_info.h_y0, line_info.h_y1 = middle, middle
+        covered = vertical | crossing
+        line_info.all_x0, line_info.all_x1 = int(first[covered].min()), int(last[covered].max())
+        line_info.all_y0, line_info.all_y1 = int(ys[covered].max()), int(ys[covered].max())
+        return line_info, edge_info, src
+
+
+def get_edges(frame: Frame, color: str) -> np.ndarray:
+    return cv2.Canny(frame.get(color + "_mask"), 75, 150)
+
+
+def hough_segments(edges: np.ndarray, scale: float, controller: HoughController = None, adapt: bool = True) -> np.ndarray:
+    """HoughLinesP 선분 (N, 1, 4), 없으면 None. 투표 수와 길이는 기준 해상도에서 정한 값에 배율을 곱한다
+    :param controller: 있으면 투표 수와 최소 길이에 controller 의 gain 을 곱하고, 찾은 선분 수를 알려 다음 프레임 값을 정하게 한다
+    """
+    if controller is None:
+        threshold, min_length = round(30 * scale), round(50 * scale)
+    else:
+        threshold, min_length = controller.get_params(30, 50, scale)
+    segments = cv2.HoughLinesP(edges, 1, 1 * np.pi / 180, threshold, np.array([]),
+                               minLineLength=min_length, maxLineGap=round(150 * scale))
+    return segments if controller is None else controller.update(segments, adapt=adapt)
+
+
+def refine_segments(segments: np.ndarray, edges: np.ndarray, radius: int, samples: int = None) -> np.ndarray:
+    """작은 해상도에서 찾은 선분을 원래 해상도의 edge 픽셀에 맞춘다.
+    선분 위 samples 개 점에서 법선 방향으로 radius 픽셀 안의 가장 가까운 edge 를 찾고,
+    선분을 따라가며 법선 방향 어긋남을 1차식(a + b * t)으로 맞춰 양 끝점을 옮긴다. 찾은 점이 2개 미만이면 그대로 둔다.
+    """
+    samples = samples or const.LINE_REFINE_SAMPLES
+    h, w = edges.shape[:2]
+    p0 = segments[:, 0, :2].astype(np.float32)
+    p1 = segments[:, 0, 2:].astype(np.float32)
+    d = p1 - p0
+    length = np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-6)
+    normal = np.stack([-d[:, 1], d[:, 0]], axis=1) / length[:, None]
+
+    t = np.linspace(0, 1, samples, dtype=np.float32)
+    # 가까운 순서 (0, -1, 1, -2, 2, ...) 로 두면 처음 만나는 edge 가 가장 가까운 edge 다
+    offsets = np.array([0] + [sign * r for r in range(1, radius + 1) for sign in (-1, 1)], dtype=np.float32)
+    # (선분, 표본점, 법선 방향 위치, xy)
+    points = p0[:, None, None, :] + t[None, :, None, None] * d[:, None, None, :] \
+        + offsets[None, None, :, None] * normal[:, None, None, :]
+    points = np.rint(points).astype(np.intp)
+    hit = edges[np.clip(points[..., 1], 0, h - 1), np.clip(points[..., 0], 0, w - 1)] > 0
+
+    nearest = np.argmax(hit, axis=2)
+    found = hit.any(axis=2).astype(np.float32)
+    offset = offsets[nearest] * found
+
+    # 가중 최소제곱 offset = a + b * t
+    sw = found.sum(axis=1)
+    st, stt = (found * t).sum(axis=1), (found * t * t).sum(axis=1)
+    so, sto = offset.sum(axis=1), (offset * t).sum(axis=1)
+    det = sw * stt - st * st
+    valid = (sw >= 2) & (det > 1e-6)
+    b = np.where(valid, (sw * sto - st * so) / np.where(valid, det, 1), 0)
+    a = np.where(valid, (so - b * st) / np.where(valid, sw, 1), 0)
+
+    p0 = p0 + a[:, None] * normal
+    p1 = p1 + (a + b)[:, None] * normal
+    refined = np.rint(np.concatenate([p0, p1], axis=1)).astype(segments.dtype)
+    return refined[:, None, :]
+
+
+def get_segments(frame: Frame, color: str, level: int = None) -> np.ndarray:
+    """
+    :param level: 0 이면 원래 해상도에서 Hough 변환을 한다. n 이면 mask 를 1/2^n 로 줄여서 선분을 찾고
+        원래 해상도 edge 에 맞춰 다듬는다 (refine_segments). 없으면 const.LINE_PYRAMID_LEVEL
+    """
+    level = const.LINE_PYRAMID_LEVEL if level is None else level
+    controller = HoughController.of(color, frame.shape)
+    if level == 0:
+        return hough_segments(frame.get(color + "_edges"), frame.scale, controller)
+    factor = 2 ** level
+    mask = frame.get(color + "_mask")
+    h, w = mask.shape[:2]
+    small = cv2.resize(mask, dsize=(max(w // factor, 1), max(h // factor, 1)), interpolation=cv2.INTER_AREA)
+    segments = hough_segments(cv2.Canny(small, 75, 150), frame.scale / factor, controller)
+    if segments is None:
+        return None
+    return refine_segments(segments * factor, frame.get(color + "_edges"), radius=factor)
+
+
+for _color in ["yellow", "green"]:
+    Frame.register(_color + "_edges", lambda frame, color=_color: get_edges(frame, color))
+    Frame.register(_color + "_segments", lambda frame, color=_color: get_segments(frame, color))
+
 
 if __name__ == "__main__":
     video = cv2.VideoCapture(0)
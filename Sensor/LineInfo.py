@@ -0,0 +1,128 @@
+from collections.abc import Mapping
+
+
+class _Info(Mapping):
+    """LineDetector 결과를 __slots__ 속성으로 담는다. 판단 코드는 속성(v_x0, h_y1 ...)을 바로 읽는다.
+    예전 dict 키로도 읽고 쓸 수 있게 mapping view 를 둔다. ("V_X" 처럼 두 값인 키는 [x0, x1] 리스트로 돌려준다)
+    색마다 예전 dict 에 있던 키가 달라서 그 키만 보이게 한다.
+    """
+    __slots__ = ("_color", "_keys")
+
+    # 예전 dict 키: 속성 이름 또는 (속성, 속성)
+    KEYS = {}
+    # 색: 그 색의 결과에 있는 예전 dict 키
+    COLOR_KEYS = {}
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        name = self.KEYS[key]
+        if isinstance(name, tuple):
+            return [getattr(self, name[0]), getattr(self, name[1])]
+        return getattr(self, name)
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        name = self.KEYS[key]
+        if isinstance(name, tuple):
+            setattr(self, name[0], value[0])
+            setattr(self, name[1], value[1])
+        else:
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return iter(self.COLOR_KEYS[self._color])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class LineInfo(_Info):
+    """두 값인 위치는 x0, x1 / y0, y1 로 나눠 담는다. np.mean(line_info["V_X"]) 대신 v_x 처럼 평균 속성을 쓴다."""
+    __slots__ = ("degree", "all", "all_x0", "all_x1", "all_y0", "all_y1",
+                 "v", "v_x0", "v_x1", "v_y0", "v_y1",
+                 "h_degree", "h", "len_h", "h_x0", "h_x1", "h_y0", "h_y1",
+                 "compact_h", "compact_h_x0", "compact_h_x1", "compact_h_y0", "compact_h_y1")
+
+    KEYS = {"DEGREE": "degree", "ALL": "all", "ALL_X": ("all_x0", "all_x1"), "ALL_Y": ("all_y0", "all_y1"),
+            "V": "v", "V_X": ("v_x0", "v_x1"), "V_Y": ("v_y0", "v_y1"),
+            "H_DEGREE": "h_degree", "H": "h", "len(H)": "len_h", "H_X": ("h_x0", "h_x1"), "H_Y": ("h_y0", "h_y1"),
+            "compact_H": "compact_h", "compact_H_X": ("compact_h_x0", "compact_h_x1"),
+            "compact_H_Y": ("compact_h_y0", "compact_h_y1")}
+    COLOR_KEYS = {
+        "YELLOW": ("DEGREE", "ALL_X", "ALL_Y", "V", "V_X", "V_Y", "H_DEGREE", "H", "H_X", "H_Y",
+                   "compact_H", "compact_H_X", "compact_H_Y"),
+        "GREEN": ("ALL", "ALL_X", "ALL_Y", "V", "V_X", "V_Y", "H", "len(H)", "H_DEGREE", "H_X", "H_Y"),
+        "BLACK": (),
+    }
+    _KEY_SETS = {color: frozenset(keys) for color, keys in COLOR_KEYS.items()}
+
+    def __init__(self, color: str = "YELLOW"):
+        self._color = color
+        self._keys = self._KEY_SETS[color]
+        self.degree = 0
+        self.all = False
+        self.all_x0 = self.all_x1 = self.all_y0 = self.all_y1 = 0
+        self.v = False
+        self.v_x0 = self.v_x1 = self.v_y0 = self.v_y1 = 0
+        self.h_degree = 0
+        self.h = False
+        self.len_h = 0
+        self.h_x0 = self.h_x1 = self.h_y0 = self.h_y1 = 0
+        self.compact_h = False
+        self.compact_h_x0 = self.compact_h_x1 = self.compact_h_y0 = self.compact_h_y1 = 0
+
+    @property
+    def v_x(self) -> float:
+        """세로선 x 평균 (예전 np.mean(line_info["V_X"]))"""
+        return (self.v_x0 + self.v_x1) / 2
+
+    @property
+    def h_x(self) -> float:
+        """가로선 x 평균 (예전 np.mean(line_info["H_X"]))"""
+        return (self.h_x0 + self.h_x1) / 2
+
+    @property
+    def h_y(self) -> float:
+        """가로선 y 평균 (예전 np.mean(line_info["H_Y"]))"""
+        return (self.h_y0 + self.h_y1) / 2
+
+    @property
+    def has_horizontal(self) -> bool:
+        """길이와 상관없이 가로선 선분이 하나라도 있었는지 (예전 line_info["H_X"] != [0, 0])"""
+        return self.h_x0 != 0 or self.h_x1 != 0
+
+
+class EdgeInfo(_Info):
+    """BLACK 결과의 edge_up_x, edge_down_x 는 예전처럼 [x0, x1] 이고 GREEN 결과는 가운데 x 하나다."""
+    __slots__ = ("edge_pos", "edge_l", "l_x0", "l_x1", "l_y0", "l_y1", "edge_r", "r_x0", "r_x1", "r_y0", "r_y1",
+                 "edge_down", "len_edge", "edge_down_x", "edge_down_y", "edge_up", "edge_up_x", "edge_up_y")
+
+    KEYS = {"EDGE_POS": "edge_pos", "EDGE_L": "edge_l", "L_X": ("l_x0", "l_x1"), "L_Y": ("l_y0", "l_y1"),
+            "EDGE_R": "edge_r", "R_X": ("r_x0", "r_x1"), "R_Y": ("r_y0", "r_y1"),
+            "EDGE_DOWN": "edge_down", "len(EDGE)": "len_edge", "EDGE_DOWN_X": "edge_down_x",
+            "EDGE_DOWN_Y": "edge_down_y", "EDGE_UP": "edge_up", "EDGE_UP_X": "edge_up_x", "EDGE_UP_Y": "edge_up_y"}
+    COLOR_KEYS = {
+        "YELLOW": ("EDGE_POS", "EDGE_L", "L_X", "L_Y", "EDGE_R", "R_X", "R_Y"),
+        "GREEN": ("EDGE_DOWN", "len(EDGE)", "EDGE_DOWN_X", "EDGE_DOWN_Y", "EDGE_UP_Y", "EDGE_UP", "EDGE_UP_X"),
+        "BLACK": ("EDGE_DOWN", "EDGE_DOWN_X", "EDGE_DOWN_Y", "EDGE_UP_Y", "EDGE_UP", "EDGE_UP_X"),
+    }
+    _KEY_SETS = {color: frozenset(keys) for color, keys in COLOR_KEYS.items()}
+
+    def __init__(self, color: str = "YELLOW"):
+        self._color = color
+        self._keys = self._KEY_SETS[color]
+        self.edge_pos = None
+        self.edge_l = False
+        self.l_x0 = self.l_x1 = self.l_y0 = self.l_y1 = 0
+        self.edge_r = False
+        self.r_x0 = self.r_x1 = self.r_y0 = self.r_y1 = 0
+        self.edge_down = False
+        self.len_edge = 0
+        self.edge_down_x = self.edge_down_y = 0
+        self.edge_up = False
+        self.edge_up_x = self.edge_up_y = 0
@@ -0,0 +1,138 @@
+import cv2
+import numpy as np
+from Constant import const
+from Sensor.Frame import Frame
+from Sensor.LineDetector import hough_segments
+from Sensor.HoughController import HoughController
+from Sensor.LineInfo import LineInfo
+
+
+class LineTracker:
+    """노란 선의 위치를 틱마다 이어서 추적해, 예측한 위치 근처에서만 Canny 와 Hough 변환을 하게 한다.
+    상태는 세로선의 (화면 가운데 높이의 x, 맨 아래 x), 가로선의 y, 전체 선 기울기(DEGREE) 이고
+    값마다 따로 움직임이 없는 모델(위치 그대로 + 잡음)의 Kalman filter 로 예측, 보정한다.
+    로봇이 얼마나 움직였는지는 모르므로 예측할 때 그 사이 보낸 동작 명령 수만큼 불확실성을 키운다.
+    """
+
+    V_TOP, V_BOTTOM, H_Y, DEGREE = range(4)
+
+    def __init__(self, process_noise: float = None, measurement_noise: float = None, max_misses: int = None):
+        self.process_noise = const.TRACK_PROCESS_NOISE if process_noise is None else process_noise
+        self.measurement_noise = const.TRACK_MEASUREMENT_NOISE if measurement_noise is None else measurement_noise
+        self.max_misses = const.TRACK_MAX_MISSES if max_misses is None else max_misses
+        self.reset()
+
+    def reset(self):
+        self.x = np.zeros(4)
+        # 분산, inf 는 아직 모르는 값
+        self.P = np.full(4, np.inf)
+        self.misses = 0
+        self.version = None
+        self.ticks = 0
+
+    @property
+    def is_tracking(self) -> bool:
+        return bool(np.isfinite(self.P[[self.V_TOP, self.V_BOTTOM]]).all() or np.isfinite(self.P[self.H_Y]))
+
+    @classmethod
+    def get_measurement(cls, line_info: LineInfo) -> tuple:
+        """:return: (측정값, 측정 여부) 각각 길이 4"""
+        z = np.zeros(4)
+        valid = np.zeros(4, dtype=bool)
+        if line_info.v:
+            z[cls.V_TOP], z[cls.V_BOTTOM] = line_info.v_x0, line_info.v_x1
+            valid[[cls.V_TOP, cls.V_BOTTOM]] = True
+        if line_info.has_horizontal:
+            z[cls.H_Y] = line_info.h_y0
+            valid[cls.H_Y] = True
+        if line_info.degree != 0:
+            z[cls.DEGREE] = line_info.degree
+            valid[cls.DEGREE] = True
+        return z, valid
+
+    @classmethod
+    def is_found(cls, line_info: LineInfo) -> bool:
+        """예측 영역에서 세로선이나 가로선을 찾았는지"""
+        _, valid = cls.get_measurement(line_info)
+        return bool(valid[[cls.V_TOP, cls.H_Y]].any())
+
+    def predict(self, version=None, scale: float = 1.0):
+        """:param version: Motion.command_count, 지난 update 이후 보낸 동작 명령 수만큼 불확실성을 키운다"""
+        steps = 1
+        if version is not None and self.version is not None:
+            steps += max(version - self.version, 0)
+        # 위치 잡음은 기준 해상도 픽셀 단위, 기울기는 도 단위
+        noise = np.array([scale, scale, scale, 1.0]) ** 2 * self.process_noise ** 2
+        self.P = self.P + steps * noise
+
+    def update(self, line_info: LineInfo, version=None, scale: float = 1.0):
+        z, valid = self.get_measurement(line_info)
+        self.version = version
+        if not valid.any():
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.reset()
+            return
+        self.misses = 0
+        R = np.array([scale, scale, scale, 1.0]) ** 2 * self.measurement_noise ** 2
+        # 처음 보는 값은 측정값 그대로, 아는 값은 Kalman gain 으로 보정
+        unknown = valid & ~np.isfinite(self.P)
+        known = valid & np.isfinite(self.P)
+        self.x[unknown], self.P[unknown] = z[unknown], R[unknown]
+        K = self.P[known] / (self.P[known] + R[known])
+        self.x[known] += K * (z[known] - self.x[known])
+        self.P[known] *= 1 - K
+
+    def get_windows(self, shape: tuple, scale: float = 1.0) -> list:
+        """예측한 선 주변 영역
+        :return: [(y0, y1, x0, x1, band)], band 는 그 영역 안에서 선 주변만 255 인 mask. 추적 중이 아니면 빈 리스트
+        """
+        h, w = shape[:2]
+        windows = []
+        margin = const.TRACK_MARGIN * scale + const.TRACK_SIGMA * np.sqrt(self.P)
+        if np.isfinite(self.P[[self.V_TOP, self.V_BOTTOM]]).all():
+            # 가운데 높이와 맨 아래 두 점을 지나는 직선을 화면 위아래 끝까지 늘린다
+            (x_mid, x_bottom), y_mid = self.x[[self.V_TOP, self.V_BOTTOM]], h / 2
+            dxdy = (x_bottom - x_mid) / max(h - 1 - y_mid, 1)
+            x_top, x_end = x_mid - dxdy * y_mid, x_mid + dxdy * (h - 1 - y_mid)
+            m = int(np.ceil(max(margin[self.V_TOP], margin[self.V_BOTTOM])))
+            x0 = int(np.clip(min(x_top, x_end) - m, 0, w))
+            x1 = int(np.clip(max(x_top, x_end) + m + 1, 0, w))
+            if x1 - x0 > 1:
+                band = np.zeros((h, x1 - x0), dtype=np.uint8)
+                cv2.line(band, (int(round(x_top)) - x0, 0), (int(round(x_end)) - x0, h - 1), 255, thickness=2 * m + 1)
+                windows.append((0, h, x0, x1, band))
+        if np.isfinite(self.P[self.H_Y]):
+            m = int(np.ceil(margin[self.H_Y]))
+            y0 = int(np.clip(self.x[self.H_Y] - m, 0, h))
+            y1 = int(np.clip(self.x[self.H_Y] + m + 1, 0, h))
+        else:
+            # 앞으로 걸어가면 새 가로선(코너, 방향 표시선)은 화면 위에서 들어오므로 위쪽 띠는 항상 본다
+            y0, y1 = 0, min(int(np.ceil(const.TRACK_ENTRY_HEIGHT * h)), h)
+        if y1 - y0 > 1:
+            windows.append((y0, y1, 0, w, None))
+        return windows
+
+    def detect(self, src, color: str = "YELLOW", version=None) -> np.ndarray:
+        """예측한 영역에서만 선분을 찾는다.
+        :return: 프레임 좌표의 선분 (N, 1, 4), 하나도 없으면 빈 배열. 추적 중이 아니거나 전체를 다시 볼 차례면 None (화면 전체에서 찾아야 함)
+        """
+        frame = Frame.of(src)
+        self.ticks += 1
+        # 예측 영역 밖에 새로 생긴 선도 놓치지 않도록 가끔은 화면 전체에서 찾는다
+        if not self.is_tracking or self.ticks % const.TRACK_REFRESH == 0:
+            return None
+        self.predict(version=version, scale=frame.scale)
+        mask = frame.get(color.lower() + "_mask")
+        found = []
+        for y0, y1, x0, x1, band in self.get_windows(mask.shape, scale=frame.scale):
+            edges = cv2.Canny(mask[y0:y1, x0:x1], 75, 150)
+            if band is not None:
+                edges = cv2.bitwise_and(edges, band)
+            # 예측 영역은 매번 크기가 바뀌므로 gain 은 같은 영역 전체를 볼 때 정한 값을 쓰기만 한다
+            segments = hough_segments(edges, frame.scale, HoughController.of(color.lower(), mask.shape), adapt=False)
+            if segments is not None:
+                found.append(segments + np.array([x0, y0, x0, y0], dtype=segments.dtype))
+        if not found:
+            return np.empty((0, 1, 4), dtype=np.int32)
+        return np.concatenate(found)
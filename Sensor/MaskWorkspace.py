@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+
+class MaskWorkspace:
+    """mask 를 만들 때 매번 새로 만들던 커널, 범위 배열, 출력 버퍼를 한 곳에 모아두고 재사용한다.
+    버퍼는 (이름, 크기) 별로 한 번만 할당되고 OpenCV 의 dst= 인자로 넘겨서 그대로 덮어쓴다.
+    따라서 반환된 mask 는 같은 이름의 mask 를 다시 요청하기 전까지만 유효하다.
+    """
+
+    def __init__(self):
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
+        self._bounds = {}
+        self._buffers = {}
+
+    def allocate(self, shape: tuple, names: list):
+        """카메라 해상도에 맞춰 mask 버퍼를 미리 할당해둔다."""
+        for name in names:
+            self.get_buffer(name, shape)
+
+    def get_bounds(self, const: list) -> tuple:
+        key = (tuple(const[0]), tuple(const[1]))
+        if key not in self._bounds:
+            self._bounds[key] = (np.array(const[0]), np.array(const[1]))
+        return self._bounds[key]
+
+    def get_buffer(self, name: str, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        key = (name, tuple(shape), dtype)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = np.empty(shape, dtype=dtype)
+        return buffer
@@ -0,0 +1,40 @@
+import time
+import cv2
+import numpy as np
+from Constant import const
+
+
+class ResultCache:
+    """로봇이 멈춰 있는 동안 거의 같은 프레임으로 같은 검출을 반복하지 않도록, 검출 결과를 프레임 서명과 함께 잠깐 기억해둔다.
+    서명은 프레임을 32x24 gray 로 줄인 것이고, 서명이 거의 같고(평균 절대 차이 < threshold) ttl 초가 안 지났고
+    그 사이에 Motion 명령이 없었으면(version 이 같으면) 저장해둔 결과를 그대로 돌려준다.
+    """
+
+    def __init__(self, ttl: float = None, threshold: float = None):
+        self.ttl = const.DEDUPE_TTL if ttl is None else ttl
+        self.threshold = const.DEDUPE_DIFF_THRESH if threshold is None else threshold
+        # key: (서명, version, 저장 시각, 결과)
+        self._entries = {}
+
+    @staticmethod
+    def get_signature(gray: np.ndarray) -> np.ndarray:
+        return cv2.resize(gray, dsize=const.DEDUPE_SIZE, interpolation=cv2.INTER_AREA)
+
+    def get(self, key, signature: np.ndarray, version=None) -> tuple:
+        """:return: (저장된 결과가 있는지, 결과)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        cached_signature, cached_version, timestamp, result = entry
+        if cached_version != version or time.monotonic() - timestamp > self.ttl:
+            del self._entries[key]
+            return False, None
+        if cv2.norm(cached_signature, signature, cv2.NORM_L1) / signature.size >= self.threshold:
+            return False, None
+        return True, result
+
+    def put(self, key, signature: np.ndarray, result, version=None):
+        self._entries[key] = (signature, version, time.monotonic(), result)
+
+    def clear(self):
+        self._entries.clear()
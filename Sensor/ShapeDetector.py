@@ -0,0 +1,89 @@
+import cv2
+import os
+import numpy as np
+from Constant import const
+from Sensor.HashDetector import HashDetector
+
+
+class ShapeDetector:
+    """평균 해시 대신 이진화된 글자의 모양 특징(descriptor) 으로 알파벳을 구분하는 검출기.
+    descriptor = 4x4 구역별 글자 비율(16) + log 스케일 Hu moment(7) + 종횡비(1), float 24 개.
+    글자의 bounding box 로 잘라서 계산하므로 ROI 의 여백이나 크기에는 영향을 덜 받는다.
+    HashDetector 와 같은 템플릿 폴더를 쓰고 detect_alphabet 도 (라벨, 거리) 를 돌려주므로 그대로 바꿔 끼울 수 있다.
+    """
+
+    zones = const.SHAPE_ZONES
+    hu_weight = const.SHAPE_HU_WEIGHT
+
+    def __init__(self, file_path, augment: bool = False) -> None:
+        """
+        :param augment: True 면 HashDetector 와 같은 방식으로 기울이고 회전한 템플릿의 descriptor 도 같이 넣는다.
+        """
+        self.file_lst = sorted(os.listdir(file_path))
+        if '.DS_Store' in self.file_lst:
+            self.file_lst.remove('.DS_Store')
+        self.directions = [file_name.rsplit('.')[0] for file_name in self.file_lst]
+        # descriptors: 템플릿 descriptor 를 한 행씩 쌓은 (템플릿 수, descriptor 길이) 행렬, labels: 각 행의 directions 번호
+        descriptors = []
+        labels = []
+        for i, file_name in enumerate(self.file_lst):
+            src = cv2.imread(file_path + file_name)
+            templates = HashDetector.augment_template(src, size=256) if augment else [src]
+            for template in templates:
+                descriptor = self.image_to_descriptor(template)
+                if descriptor is not None:
+                    descriptors.append(descriptor)
+                    labels.append(i)
+        self.descriptors = np.stack(descriptors)
+        self.labels = np.array(labels, dtype=np.intp)
+        print(self.directions, self.descriptors.shape)
+
+    @classmethod
+    def image_to_descriptor(cls, img: np.ndarray) -> np.ndarray:
+        """글자(어두운 부분)를 전경으로 이진화한 뒤 descriptor 를 만든다. 전경이 없으면 None"""
+        if len(img.shape) == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # 템플릿처럼 흰 바탕에 검은 글자라고 보고, 글자가 255 가 되도록 THRESH_BINARY_INV
+        _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) == 0:
+            return None
+        # 가장 큰 덩어리를 글자로 보고 그 bounding box 로 자른다 (가장자리 잡티 무시)
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        if w < 4 or h < 4:
+            return None
+        letter = binary[y:y + h, x:x + w]
+
+        # 구역별 전경 비율: INTER_AREA 로 줄이면 각 픽셀이 구역 평균이 된다
+        zoning = cv2.resize(letter, dsize=cls.zones, interpolation=cv2.INTER_AREA).reshape(-1) / 255.0
+        # Hu moment 는 크기 차이가 수십 자리이므로 log 스케일로 맞춘다
+        hu = cv2.HuMoments(cv2.moments(letter, binaryImage=True)).reshape(-1)
+        hu = -np.sign(hu) * np.log10(np.abs(hu) + 1e-30)
+        hu = np.clip(hu, -30, 30) * cls.hu_weight
+        aspect = np.log2(w / h)
+        return np.concatenate([zoning, hu, [aspect]]).astype(np.float32)
+
+    def get_distances(self, descriptor: np.ndarray) -> np.ndarray:
+        """모든 템플릿과의 평균 절대 차이"""
+        return np.abs(self.descriptors - descriptor).mean(axis=1)
+
+    def detect_alphabet(self, img: np.ndarray, threshold=0.2) -> tuple:
+        descriptor = self.image_to_descriptor(img)
+        if descriptor is None:
+            return None, None
+        distances = self.get_distances(descriptor)
+        best = int(np.argmin(distances))
+        if distances[best] > threshold:
+            return None, None
+
+        return self.directions[self.labels[best]], float(distances[best])
+
+
+if __name__ == "__main__":
+    from Sensor.ImageProcessor import ImageProcessor
+    imageProcessor = ImageProcessor(video_path='Sensor/src/door_test/E.h264')
+    shapeDetector = ShapeDetector(file_path='Sensor/EWSN/')
+    while True:
+        roi_mask = imageProcessor.get_door_alphabet_roi(visualization=True)
+        if roi_mask is not None:
+            print(shapeDetector.detect_alphabet(roi_mask))
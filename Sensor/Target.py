@@ -134,6 +134,153 @@ class Target:
             return None
 
 
+class TargetSet:
+    """Target 여러 개를 열(column) 별 NumPy 배열로 들고 있는 묶음 (struct of arrays).
+    connectedComponentsWithStats 의 stats 나 contour 리스트에서 바로 만들고, 필터링, 정렬, IoU, NMS 를 한 번에 계산한다.
+    실제로 쓰일 후보만 get_target 으로 Target 객체를 만든다.
+    """
+
+    def __init__(self, x, y, width, height, area, center_x, center_y, color=None, index=None):
+        """
+        :param index: 각 후보가 원래 contour 리스트 / 라벨에서 몇 번째였는지. 생략하면 0, 1, 2, ...
+        """
+        self.x = np.asarray(x, dtype=np.int64)
+        self.y = np.asarray(y, dtype=np.int64)
+        self.width = np.asarray(width, dtype=np.int64)
+        self.height = np.asarray(height, dtype=np.int64)
+        self.area = np.asarray(area, dtype=np.float64)
+        self.center_x = np.asarray(center_x, dtype=np.int64)
+        self.center_y = np.asarray(center_y, dtype=np.int64)
+        self.index = np.arange(len(self.x)) if index is None else np.asarray(index, dtype=np.intp)
+        self._color = color
+
+    @classmethod
+    def from_stats(cls, stats: np.ndarray, centroids: np.ndarray, color=None):
+        """cv2.connectedComponentsWithStats 의 stats, centroids 로부터. 중심점이 NaN 인 라벨은 뺀다."""
+        valid = ~np.isnan(centroids).any(axis=1)
+        stats, centroids = stats[valid], centroids[valid]
+        return cls(stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP], stats[:, cv2.CC_STAT_WIDTH],
+                   stats[:, cv2.CC_STAT_HEIGHT], stats[:, cv2.CC_STAT_AREA],
+                   centroids[:, 0].astype(np.int64), centroids[:, 1].astype(np.int64), color=color,
+                   index=np.flatnonzero(valid))
+
+    @classmethod
+    def from_contours(cls, contours: list, color=None):
+        """contour 리스트로부터. 중심은 Target(contour=...) 와 같이 bounding box 의 중심.
+        contour 마다 boundingRect, contourArea 를 부르는 대신 모든 점을 한 배열로 이어붙이고
+        contour 별 구간을 reduceat 으로 한 번에 줄여서 bounding box 와 넓이(신발끈 공식)를 구한다.
+        """
+        if len(contours) == 0:
+            return cls([], [], [], [], [], [], [], color=color)
+        lengths = np.array([len(contour) for contour in contours])
+        starts = np.zeros_like(lengths)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        pts = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+        px, py = pts[:, 0], pts[:, 1]
+
+        x = np.minimum.reduceat(px, starts)
+        y = np.minimum.reduceat(py, starts)
+        width = np.maximum.reduceat(px, starts) - x + 1
+        height = np.maximum.reduceat(py, starts) - y + 1
+
+        # 각 점의 다음 점 (contour 의 마지막 점은 첫 점으로 이어진다)
+        following = np.arange(1, len(pts) + 1)
+        following[starts + lengths - 1] = starts
+        cross = px * py[following] - px[following] * py
+        area = np.abs(np.add.reduceat(cross, starts)) / 2
+        return cls(x, y, width, height, area, x + width // 2, y + height // 2, color=color)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        """bool mask 나 index 배열로 고른 부분 집합"""
+        return TargetSet(self.x[index], self.y[index], self.width[index], self.height[index], self.area[index],
+                         self.center_x[index], self.center_y[index], color=self._color, index=self.index[index])
+
+    def get_aspect_ratio(self) -> np.ndarray:
+        """긴 변 / 짧은 변 (1 이상)"""
+        return np.maximum(self.width, self.height) / np.minimum(self.width, self.height)
+
+    def filter(self, min_area: float = None, min_box_area: float = None, max_aspect_ratio: float = None):
+        """조건을 모두 만족하는 후보만 남긴 TargetSet. 종횡비는 기존 코드처럼 소수 둘째 자리에서 반올림해서 비교한다."""
+        keep = np.ones(len(self), dtype=bool)
+        if min_area is not None:
+            keep &= self.area > min_area
+        if min_box_area is not None:
+            keep &= self.width * self.height > min_box_area
+        if max_aspect_ratio is not None:
+            keep &= np.round(self.get_aspect_ratio(), 2) <= max_aspect_ratio
+        return self[keep]
+
+    def select_polygons(self, contours: list, vertices: int, epsilon: float = 0.02):
+        """approxPolyDP 로 근사한 꼭짓점 수가 vertices 인 후보만 남긴다.
+        비싼 다각형 근사는 filter 를 통과한 후보의 contour 에만 한다.
+        """
+        keep = [len(cv2.approxPolyDP(contours[i], cv2.arcLength(contours[i], True) * epsilon, True)) == vertices
+                for i in self.index]
+        return self[np.array(keep, dtype=bool)]
+
+    def get_target(self, i: int) -> Target:
+        stats = (self.x[i], self.y[i], self.width[i], self.height[i], self.area[i])
+        return Target(color=self._color, stats=stats, centroid=(self.center_x[i], self.center_y[i]))
+
+    def get_targets(self) -> list:
+        return [self.get_target(i) for i in range(len(self))]
+
+    def sort(self, key: str = "area", reverse: bool = False):
+        """key 열 기준으로 정렬한 TargetSet (같은 값이면 원래 순서 유지)"""
+        order = np.argsort(getattr(self, key), kind="stable")
+        return self[order[::-1] if reverse else order]
+
+    def argmax(self, key: str = "area") -> int:
+        return int(np.argmax(getattr(self, key)))
+
+    def argmin(self, key: str = "area") -> int:
+        return int(np.argmin(getattr(self, key)))
+
+    def iou_matrix(self, other) -> np.ndarray:
+        """(len(self), len(other)) IoU 행렬. Target.compute_iou4target 과 같은 식"""
+        area1 = (self.width + 1) * (self.height + 1)
+        area2 = (other.width + 1) * (other.height + 1)
+        x1 = np.maximum(self.x[:, None], other.x[None, :])
+        y1 = np.maximum(self.y[:, None], other.y[None, :])
+        x2 = np.minimum((self.x + self.width)[:, None], (other.x + other.width)[None, :])
+        y2 = np.minimum((self.y + self.height)[:, None], (other.y + other.height)[None, :])
+        inter = np.maximum(0, x2 - x1 + 1) * np.maximum(0, y2 - y1 + 1)
+        return inter / (area1[:, None] + area2[None, :] - inter)
+
+    @staticmethod
+    def non_maximum_suppression(targets1, targets2, threshold: float):  # -> return Target Object
+        """Target.non_maximum_suppression4targets 와 같은 결과를 IoU 행렬 한 번으로 구한다.
+        두 묶음 모두 있으면 IoU 가 threshold 보다 큰 가장 겹치는 쌍의 교집합, 한쪽만 있으면 그중 가장 큰 것
+        """
+        if len(targets1) and len(targets2):
+            iou = targets1.iou_matrix(targets2)
+            # argmax 는 처음 나온 최댓값을 고르므로 이중 for 문에서 처음 갱신된 쌍과 같다
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[i, j] <= threshold:
+                return None
+            x1 = max(targets1.x[i], targets2.x[j])
+            y1 = max(targets1.y[i], targets2.y[j])
+            x2 = min(targets1.x[i] + targets1.width[i], targets2.x[j] + targets2.width[j])
+            y2 = min(targets1.y[i] + targets1.height[i], targets2.y[j] + targets2.height[j])
+            width = max(0, x2 - x1 + 1)
+            height = max(0, y2 - y1 + 1)
+            centroid = (x1 + (width // 2), y1 + (height // 2))
+            stats = (x1, y1, width, height, width * height)
+            return Target(color=targets1._color, stats=stats, centroid=centroid)
+
+        elif len(targets1):
+            return targets1.get_target(targets1.argmax())
+
+        elif len(targets2):
+            return targets2.get_target(targets2.argmax())
+
+        else:
+            return None
+
+
 def setLabel(src, pts, label=None, color=(0,255,0)):
     if type(pts) == type(np.array([])) :
         (x, y, w, h) = cv2.boundingRect(pts)